@@ -0,0 +1,33 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from drugs.models import Allergy, Drug
+
+
+DRUG_ALLERGY_CONFLICTS_KEY = 'analytics:drug_allergy_conflicts'
+# Safety net for per-process caches (LocMemCache) that never see another process's signals
+DRUG_ALLERGY_CONFLICTS_TIMEOUT = 60 * 60
+
+
+def load_drug_allergy_conflicts():
+    """Map every drug id to the frozenset of allergy ids it conflicts with, loaded with a single query"""
+    conflicts = defaultdict(set)
+    for drug_id, allergy_id in Drug.allergy_conflicts.through.objects.values_list('drug_id', 'allergy_id'):
+        conflicts[drug_id].add(allergy_id)
+    return {drug_id: frozenset(allergy_ids) for drug_id, allergy_ids in conflicts.items()}
+
+
+def drug_allergy_conflicts():
+    """load_drug_allergy_conflicts(), shared through the cache until a drug's allergy conflicts change.
+    Drugs without conflicts are absent, so look them up with .get(drug_id, frozenset())"""
+    return cache.get_or_set(DRUG_ALLERGY_CONFLICTS_KEY, load_drug_allergy_conflicts, DRUG_ALLERGY_CONFLICTS_TIMEOUT)
+
+
+@receiver(m2m_changed, sender=Drug.allergy_conflicts.through)
+@receiver(post_delete, sender=Drug)
+@receiver(post_delete, sender=Allergy)
+def invalidate_drug_allergy_conflicts(**kwargs):
+    cache.delete(DRUG_ALLERGY_CONFLICTS_KEY)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analytics'
+
+    def ready(self):
+        # Connects the receivers that drop cached reference tables and dashboards
+        from analytics import allergies, caching, interactions  # noqa: F401
@@ -0,0 +1,125 @@
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+import orjson
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from rx.models import Prescription, PrescriptionMedication
+
+
+ROLLUP_VERSION_KEY = 'analytics:rollup_version'
+ROLLUP_CACHE_TIMEOUT = 60 * 60 * 24
+# Live dashboards also read patients, allergies and interactions, which do not bump the prescriber version
+DASHBOARD_CACHE_TIMEOUT = 60 * 5
+
+
+def rollup_version():
+    """Current rollup version; changes every time refresh_analytics runs"""
+    return cache.get_or_set(ROLLUP_VERSION_KEY, lambda: str(time.time()), None)
+
+
+def bump_rollup_version():
+    """Invalidate every cached rollup response by moving to a new version"""
+    cache.set(ROLLUP_VERSION_KEY, str(time.time()), None)
+
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def encode_json(payload):
+    """Serialize a dashboard payload with orjson; Decimals and other extras fall back to str like DRF"""
+    return orjson.dumps(payload, default=str, option=JSON_OPTIONS)
+
+
+def iter_json(payload, streamed_key):
+    """Yield payload encoded as a JSON object in chunks, writing payload[streamed_key],
+    an iterable of (key, value) pairs, as a nested object one entry at a time"""
+    yield b'{'
+    for index, (key, value) in enumerate(payload.items()):
+        if index:
+            yield b','
+        yield encode_json(str(key)) + b':'
+        if key != streamed_key:
+            yield encode_json(value)
+            continue
+        yield b'{'
+        for entry, (entry_key, entry_value) in enumerate(value):
+            yield (b',' if entry else b'') + encode_json(str(entry_key)) + b':' + encode_json(entry_value)
+        yield b'}'
+    yield b'}'
+
+
+def cached_rollup_json(name, builder, *args):
+    """Return builder(*args) encoded as JSON bytes, cached until the next rollup refresh"""
+    key = f"analytics:{name}:{rollup_version()}:{':'.join(str(arg) for arg in args)}"
+    body = cache.get(key)
+    if body is None:
+        body = encode_json(builder(*args))
+        cache.set(key, body, ROLLUP_CACHE_TIMEOUT)
+    return body
+
+
+def prescriber_version(prescriber_id):
+    """Current version of a prescriber's live dashboards; changes whenever one of their prescriptions does"""
+    return cache.get_or_set(f'analytics:prescriber_version:{prescriber_id}', lambda: str(time.time()), None)
+
+
+def bump_prescriber_version(prescriber_id):
+    cache.set(f'analytics:prescriber_version:{prescriber_id}', str(time.time()), None)
+
+
+def cached_dashboard(name):
+    """Cache a live dashboard view's JSON body per user and query string for DASHBOARD_CACHE_TIMEOUT.
+
+    Clinic-scope requests are left to cached_rollup_json(); error responses are never cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.GET.get('scope') == 'clinic':
+                return view(request, *args, **kwargs)
+
+            user_id = request.user.id
+            params = urlencode(sorted(request.GET.lists()), doseq=True)
+            key = f"analytics:dashboard:{name}:{user_id}:{prescriber_version(user_id)}:{params}"
+            body = cache.get(key)
+            if body is not None:
+                return HttpResponse(body, content_type='application/json')
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if response.streaming:
+                response.streaming_content = _cache_when_streamed(response.streaming_content, key)
+            else:
+                cache.set(key, response.content, DASHBOARD_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def _cache_when_streamed(chunks, key):
+    """Pass a streamed body through unchanged, caching it once the last chunk has been sent"""
+    body = []
+    for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    cache.set(key, b''.join(body), DASHBOARD_CACHE_TIMEOUT)
+
+
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+def invalidate_prescriber_dashboards(instance, **kwargs):
+    bump_prescriber_version(instance.prescriber_id)
+
+
+@receiver(post_save, sender=PrescriptionMedication)
+@receiver(post_delete, sender=PrescriptionMedication)
+def invalidate_medication_dashboards(instance, **kwargs):
+    prescriber_id = Prescription.objects.filter(pk=instance.prescription_id).values_list('prescriber_id', flat=True).first()
+    if prescriber_id is not None:
+        bump_prescriber_version(prescriber_id)
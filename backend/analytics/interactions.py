@@ -0,0 +1,43 @@
+from collections import defaultdict
+from itertools import combinations
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from drugs.models import Interaction
+
+
+INTERACTING_PAIRS_KEY = 'analytics:interacting_pairs'
+# Safety net for per-process caches (LocMemCache) that never see another process's signals
+INTERACTING_PAIRS_TIMEOUT = 60 * 60
+
+
+def load_interacting_pairs():
+    """Map every (low_id, high_id) drug pair that belongs to a recorded Interaction
+    to the severities of those interactions, loaded with a single query"""
+    drugs_by_interaction = defaultdict(list)
+    severities = {}
+    for interaction_id, severity, drug_id in Interaction.drugs.through.objects.values_list(
+        'interaction_id', 'interaction__severity', 'drug_id'
+    ):
+        drugs_by_interaction[interaction_id].append(drug_id)
+        severities[interaction_id] = severity
+
+    pairs = defaultdict(list)
+    for interaction_id, drug_ids in drugs_by_interaction.items():
+        for pair in combinations(sorted(drug_ids), 2):
+            pairs[pair].append(severities[interaction_id])
+    return dict(pairs)
+
+
+def interacting_pairs():
+    """load_interacting_pairs(), shared through the cache until an Interaction changes"""
+    return cache.get_or_set(INTERACTING_PAIRS_KEY, load_interacting_pairs, INTERACTING_PAIRS_TIMEOUT)
+
+
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+@receiver(m2m_changed, sender=Interaction.drugs.through)
+def invalidate_interacting_pairs(**kwargs):
+    cache.delete(INTERACTING_PAIRS_KEY)
@@ -0,0 +1 @@
+# management package for custom Django commands
@@ -0,0 +1 @@
+# commands package for custom Django management commands 
\ No newline at end of file
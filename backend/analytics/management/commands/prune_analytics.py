@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.caching import bump_rollup_version
+from analytics.models import PrescriptionAnalytics, SafetyScoreAnalytics, UsageStatistics
+
+
+# Daily rollup tables that grow by one day (or one day per drug) on every refresh
+DAILY_ROLLUPS = [PrescriptionAnalytics, SafetyScoreAnalytics, UsageStatistics]
+
+
+class Command(BaseCommand):
+    help = 'Delete daily analytics rollups older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=730,
+            help='Number of trailing days of rollups to keep (default: 730)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would be deleted without deleting them',
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help='Delete without prompting for confirmation',
+        )
+
+    def handle(self, *args, **options):
+        if options['keep_days'] < 1:
+            raise CommandError('--keep-days must be at least 1')
+        cutoff = timezone.now().date() - timedelta(days=options['keep_days'])
+
+        # Each table is cleared with one DELETE ... WHERE date < cutoff range scan on its date index
+        expired = {model: model.objects.filter(date__lt=cutoff) for model in DAILY_ROLLUPS}
+        for model, rows in expired.items():
+            self.stdout.write(f'{model.__name__}: {rows.count()} row(s) dated before {cutoff.isoformat()}')
+
+        if options['dry_run']:
+            return
+        if not options['yes']:
+            confirm = input(f'This will delete all analytics rollups before {cutoff.isoformat()}. Type "yes" to confirm: ')
+            if confirm.lower() != 'yes':
+                self.stdout.write(self.style.WARNING('Aborted: no rollups deleted.'))
+                return
+
+        with transaction.atomic():
+            deleted = sum(rows.delete()[0] for rows in expired.values())
+        bump_rollup_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} rollup row(s) dated before {cutoff.isoformat()}'))
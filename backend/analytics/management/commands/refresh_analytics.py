@@ -0,0 +1,432 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from analytics.caching import bump_rollup_version
+from analytics.interactions import load_interacting_pairs
+from analytics.parsing import parse_dosage, parse_duration_days
+from analytics.scoring import age_on, years_before
+from analytics.models import (
+    AllergyDistributionBucket, AllergyPatternAnalysis, DrugInteractionAnalytics, PrescriptionAnalytics,
+    SafetyScoreAnalytics, UsageStatistics
+)
+from drugs.models import Drug
+from patients.models import Patient, PatientAllergy
+from rx.models import Prescription, PrescriptionMedication
+
+
+# Rows fetched per round-trip when streaming querysets with .iterator()
+CHUNK_SIZE = 2000
+
+# Drug.category values that have a dedicated counter on PrescriptionAnalytics
+CATEGORY_FIELDS = {
+    'Antibiotic': 'antibiotics_count',
+    'Analgesic': 'analgesics_count',
+    'Antihypertensive': 'antihypertensives_count',
+    'Antidiabetic': 'antidiabetics_count',
+    'Statin': 'statins_count',
+}
+
+# Prescription status counters on PrescriptionAnalytics, aggregated per prescribed_date
+STATUS_COUNTERS = {
+    'total_prescriptions': Count('id'),
+    'active_prescriptions': Count('id', filter=Q(status='active')),
+    'completed_prescriptions': Count('id', filter=Q(status='completed')),
+    'cancelled_prescriptions': Count('id', filter=Q(status='cancelled')),
+    'expired_prescriptions': Count('id', filter=Q(status='expired')),
+}
+
+
+def age_group_expression(day):
+    """SQL CASE bucketing patient__date_of_birth into the pediatric/adult/geriatric groups on the given day"""
+    return Case(
+        When(patient__date_of_birth__gt=years_before(day, 18), then=Value('pediatric')),
+        When(patient__date_of_birth__gt=years_before(day, 65), then=Value('adult')),
+        default=Value('geriatric'),
+    )
+
+
+def safety_scores(has_allergy_conflict, has_contraindications, pediatric_safe, ages):
+    """Same scoring rules as the live safety dashboard, limited to stored fields,
+    applied to whole arrays of medications at once"""
+    scores = np.where(has_contraindications, 0.9, 1.0)
+    scores *= np.where((ages < 12) & ~pediatric_safe, 0.9, np.where(ages > 65, 0.95, 1.0))
+    scores[has_allergy_conflict] = 0.0
+    return scores
+
+
+def grouped_mean(groups, values, group_count):
+    """Mean of the non-NaN values in each group; 0 for groups without any"""
+    valid = ~np.isnan(values)
+    totals = np.bincount(groups[valid], weights=values[valid], minlength=group_count)
+    counts = np.bincount(groups[valid], minlength=group_count)
+    return np.divide(totals, counts, out=np.zeros(group_count), where=counts > 0)
+
+
+def upsert(model, objs, unique_fields):
+    """Write rollup rows with a single INSERT ... ON CONFLICT DO UPDATE"""
+    update_fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in unique_fields and field.name != 'created_at'
+    ]
+    model.objects.bulk_create(
+        objs, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+    )
+
+
+def co_prescribed_rows(prescription_ids):
+    """Row index arrays (first, second) of every pair of rows sharing a prescription.
+
+    prescription_ids must be sorted so each prescription is a contiguous run; the
+    C(k, 2) pairs of all runs of length k are enumerated together with triu_indices.
+    """
+    _, starts, sizes = np.unique(prescription_ids, return_index=True, return_counts=True)
+    firsts, seconds = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for k in np.unique(sizes[sizes > 1]):
+        i, j = np.triu_indices(k, 1)
+        run_starts = starts[sizes == k][:, None]
+        firsts.append((run_starts + i).ravel())
+        seconds.append((run_starts + j).ravel())
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily analytics rollup tables from prescription data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of days to rebuild, ending today (default: 1)',
+        )
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Rebuild a single day (YYYY-MM-DD) instead of a trailing window',
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                days = [datetime.strptime(options['date'], '%Y-%m-%d').date()]
+            except ValueError:
+                raise CommandError(f'Invalid date "{options["date"]}". Use YYYY-MM-DD.')
+        else:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            today = timezone.now().date()
+            days = [today - timedelta(days=i) for i in range(options['days'])]
+
+        self.interaction_pairs = load_interacting_pairs()
+        status_counts = self.prescription_status_counts(days)
+
+        prescription_rollups = []
+        safety_rollups = []
+        usage_rollups = []
+        for day in days:
+            meds = self.medication_arrays(day)
+            prescription_rollups.append(self.prescription_analytics(day, meds, status_counts.get(day, {})))
+            safety_rollups.append(self.safety_score_analytics(day, meds))
+            usage_rollups.extend(self.usage_statistics(day, meds))
+            self.stdout.write(f'Computed analytics for {day.isoformat()}')
+
+        with transaction.atomic():
+            upsert(PrescriptionAnalytics, prescription_rollups, ['date'])
+            upsert(SafetyScoreAnalytics, safety_rollups, ['date'])
+            upsert(UsageStatistics, usage_rollups, ['date', 'drug'])
+
+            # Drugs no longer prescribed on a refreshed day must not keep a stale row
+            current = {(usage.date, usage.drug_id) for usage in usage_rollups}
+            stale_ids = [
+                usage_id for usage_id, date, drug_id
+                in UsageStatistics.objects.filter(date__in=days).values_list('id', 'date', 'drug_id').iterator(
+                    chunk_size=CHUNK_SIZE
+                )
+                if (date, drug_id) not in current
+            ]
+            UsageStatistics.objects.filter(id__in=stale_ids).delete()
+
+        with transaction.atomic():
+            self.refresh_allergy_patterns()
+
+        with transaction.atomic():
+            self.refresh_interaction_analytics()
+
+        bump_rollup_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Analytics rollups refreshed for {len(days)} day(s)'))
+
+    def medication_arrays(self, day):
+        """Column arrays over every PrescriptionMedication prescribed on the day,
+        with allergy-conflict, interaction and safety-score columns resolved"""
+        medications = PrescriptionMedication.objects.filter(prescription__prescribed_date=day)
+
+        conflicting_ids = set(medications.filter(
+            drug__allergy_conflicts__patient_allergies__patient=F('prescription__patient')
+        ).values_list('id', flat=True).iterator(chunk_size=CHUNK_SIZE))
+
+        # Stream rows straight into per-column lists instead of materializing the day's tuples
+        columns = [[] for _ in range(11)]
+        for row in medications.values_list(
+            'id', 'prescription_id', 'drug_id', 'dosage', 'duration', 'quantity',
+            'drug__category', 'drug__therapeutic_class', 'drug__contraindications', 'drug__pediatric_safe',
+            'prescription__patient__date_of_birth',
+        ).iterator(chunk_size=CHUNK_SIZE):
+            for column, value in zip(columns, row):
+                column.append(value)
+        (ids, prescription_ids, drug_ids, dosages, durations, quantities,
+         categories, therapeutic_classes, contraindications, pediatric_safe, dates_of_birth) = columns
+
+        drugs_by_prescription = defaultdict(list)
+        for prescription_id, drug_id in zip(prescription_ids, drug_ids):
+            drugs_by_prescription[prescription_id].append(drug_id)
+
+        meds = {
+            'prescription_id': np.array(prescription_ids, dtype=np.int64),
+            'drug_id': np.array(drug_ids, dtype=np.int64),
+            'quantity': np.array(quantities, dtype=np.int64),
+            'category': np.array(categories, dtype=object),
+            'therapeutic_class': np.array([tc or '' for tc in therapeutic_classes], dtype=object),
+            # Unparseable values become NaN, which grouped_mean skips
+            'dosage': np.array([parse_dosage(d) for d in dosages], dtype=np.float64),
+            'duration_days': np.array([parse_duration_days(d) for d in durations], dtype=np.float64),
+            'age': np.array([age_on(dob, day) for dob in dates_of_birth], dtype=np.int64),
+            'has_allergy_conflict': np.array([med_id in conflicting_ids for med_id in ids], dtype=bool),
+            'interaction_warnings': np.array([
+                sum(
+                    1 for other_id in drugs_by_prescription[prescription_id]
+                    if (min(drug_id, other_id), max(drug_id, other_id)) in self.interaction_pairs
+                )
+                for prescription_id, drug_id in zip(prescription_ids, drug_ids)
+            ], dtype=np.int64),
+        }
+        meds['safety_score'] = safety_scores(
+            meds['has_allergy_conflict'],
+            np.array([bool(c) for c in contraindications], dtype=bool),
+            np.array(pediatric_safe, dtype=bool),
+            meds['age'],
+        )
+        return meds
+
+    def prescription_status_counts(self, days):
+        """STATUS_COUNTERS for every refreshed day from a single GROUP BY prescribed_date"""
+        return {
+            row.pop('prescribed_date'): row
+            for row in Prescription.objects.filter(prescribed_date__in=days).order_by().values(
+                'prescribed_date'
+            ).annotate(**STATUS_COUNTERS)
+        }
+
+    def prescription_analytics(self, day, meds, status_counts):
+        defaults = dict.fromkeys(STATUS_COUNTERS, 0)
+        defaults.update(status_counts)
+
+        defaults.update({field: 0 for field in CATEGORY_FIELDS.values()})
+        defaults['other_count'] = 0
+        categories, category_counts = np.unique(meds['category'], return_counts=True)
+        for category, count in zip(categories, category_counts):
+            defaults[CATEGORY_FIELDS.get(category, 'other_count')] += int(count)
+
+        defaults['allergy_warnings_count'] = int(meds['has_allergy_conflict'].sum())
+        defaults['drug_interaction_warnings_count'] = int(meds['interaction_warnings'].sum())
+
+        # A repeated (prescription, therapeutic class) pair is a duplicate therapy
+        classified = meds['therapeutic_class'] != ''
+        classes, class_codes = np.unique(meds['therapeutic_class'], return_inverse=True)
+        prescription_classes = meds['prescription_id'][classified] * len(classes) + class_codes[classified]
+        defaults['duplicate_therapy_warnings_count'] = int(classified.sum() - len(np.unique(prescription_classes)))
+
+        return PrescriptionAnalytics(date=day, **defaults)
+
+    def safety_score_analytics(self, day, meds):
+        scores = meds['safety_score']
+        categories, category_codes = np.unique(meds['category'], return_inverse=True)
+        category_averages = np.bincount(category_codes, weights=scores, minlength=len(categories)) / np.maximum(
+            np.bincount(category_codes, minlength=len(categories)), 1
+        )
+
+        contraindicated = int((scores == 0).sum())
+        low_safety = int((scores < 0.6).sum())
+        top_issues = []
+        if contraindicated > 0:
+            top_issues.append(SafetyScoreAnalytics.CONTRAINDICATED_ISSUE)
+        if low_safety > 0:
+            top_issues.append(SafetyScoreAnalytics.LOW_SAFETY_ISSUE)
+
+        return SafetyScoreAnalytics(
+            date=day,
+            average_safety_score=float(scores.mean()) if len(scores) else 0,
+            high_safety_prescriptions=int((scores >= 0.8).sum()),
+            medium_safety_prescriptions=int(((scores >= 0.6) & (scores < 0.8)).sum()),
+            low_safety_prescriptions=low_safety,
+            contraindicated_prescriptions=contraindicated,
+            safety_by_category={
+                category: float(average) for category, average in zip(categories, category_averages)
+            },
+            top_safety_issues=top_issues,
+        )
+
+    def usage_statistics(self, day, meds):
+        drug_ids, first_rows, drug_codes, prescriptions_counts = np.unique(
+            meds['drug_id'], return_index=True, return_inverse=True, return_counts=True
+        )
+        drug_categories = meds['category'][first_rows]
+        drug_count = len(drug_ids)
+
+        def per_drug_sum(values):
+            return np.bincount(drug_codes, weights=values, minlength=drug_count)
+
+        ages = meds['age']
+        total_quantities = per_drug_sum(meds['quantity'])
+        pediatric_usage = per_drug_sum(ages < 18)
+        adult_usage = per_drug_sum((ages >= 18) & (ages < 65))
+        geriatric_usage = per_drug_sum(ages >= 65)
+        allergy_conflicts = per_drug_sum(meds['has_allergy_conflict'])
+        interaction_warnings = per_drug_sum(meds['interaction_warnings'])
+        average_dosages = grouped_mean(drug_codes, meds['dosage'], drug_count)
+        average_durations = grouped_mean(drug_codes, meds['duration_days'], drug_count)
+        average_safety_scores = per_drug_sum(meds['safety_score']) / np.maximum(prescriptions_counts, 1)
+
+        return [
+            UsageStatistics(
+                date=day,
+                drug_id=drug_id,
+                drug_category=drug_categories[i],
+                prescriptions_count=int(prescriptions_counts[i]),
+                total_quantity_prescribed=int(total_quantities[i]),
+                average_dosage=float(average_dosages[i]),
+                average_duration_days=float(average_durations[i]),
+                pediatric_usage=int(pediatric_usage[i]),
+                adult_usage=int(adult_usage[i]),
+                geriatric_usage=int(geriatric_usage[i]),
+                allergy_conflicts_count=int(allergy_conflicts[i]),
+                interaction_warnings_count=int(interaction_warnings[i]),
+                average_safety_score=float(average_safety_scores[i]),
+            )
+            for i, drug_id in enumerate(drug_ids.tolist())
+        ]
+
+    def refresh_allergy_patterns(self):
+        """Rebuild AllergyPatternAnalysis and its distribution buckets across all patients"""
+        today = timezone.now().date()
+        total_patients = Patient.objects.count()
+
+        # One GROUP BY (allergy, bucket) per distribution rather than a Python pass over every PatientAllergy
+        distributions = {
+            'age_groups': age_group_expression(today),
+            'gender_distribution': F('patient__gender'),
+            'severity_distribution': Coalesce(NullIf('severity', Value('')), Value('moderate')),
+        }
+        patterns = {}
+        for distribution, bucket in distributions.items():
+            for allergy_id, key, count in PatientAllergy.objects.annotate(bucket=bucket).order_by().values_list(
+                'allergy_id', 'bucket'
+            ).annotate(count=Count('id')):
+                pattern = patterns.setdefault(allergy_id, {
+                    'age_groups': {'pediatric': 0, 'adult': 0, 'geriatric': 0},
+                    'gender_distribution': {'M': 0, 'F': 0, 'O': 0},
+                    'severity_distribution': {'mild': 0, 'moderate': 0, 'severe': 0},
+                })
+                pattern[distribution][key] = count
+        for pattern in patterns.values():
+            pattern['count'] = sum(pattern['age_groups'].values())
+
+        conflicts = defaultdict(list)
+        for allergy_id, drug_name in Drug.objects.filter(
+            allergy_conflicts__in=patterns.keys()
+        ).values_list('allergy_conflicts', 'name'):
+            conflicts[allergy_id].append(drug_name)
+
+        buckets = []
+        for allergy_id, pattern in patterns.items():
+            drug_conflicts = conflicts[allergy_id][:5]
+            AllergyPatternAnalysis.objects.update_or_create(allergy_id=allergy_id, defaults={
+                'total_patients_with_allergy': pattern['count'],
+                'percentage_of_population': round((pattern['count'] / total_patients) * 100, 2),
+                'most_common_age_group': max(pattern['age_groups'], key=pattern['age_groups'].get),
+                'common_drug_conflicts': drug_conflicts,
+                **{
+                    field: pattern[distribution].get(key, 0)
+                    for distribution, fields in (
+                        ('gender_distribution', AllergyPatternAnalysis.GENDER_COUNT_FIELDS),
+                        ('severity_distribution', AllergyPatternAnalysis.SEVERITY_COUNT_FIELDS),
+                    )
+                    for key, field in fields.items()
+                },
+            })
+            for drug_name in drug_conflicts:
+                buckets.append(AllergyDistributionBucket(
+                    allergy_id=allergy_id, bucket_type='drug_conflict', key=drug_name, count=pattern['count']
+                ))
+
+        AllergyPatternAnalysis.objects.exclude(allergy_id__in=patterns.keys()).delete()
+        AllergyDistributionBucket.objects.all().delete()
+        AllergyDistributionBucket.objects.bulk_create(buckets)
+        self.stdout.write(f'Refreshed allergy patterns for {len(patterns)} allergies')
+
+    def refresh_interaction_analytics(self):
+        """Rebuild DrugInteractionAnalytics from every pair of drugs prescribed together"""
+        today = timezone.now().date()
+        columns = [[] for _ in range(4)]
+        for row in PrescriptionMedication.objects.order_by('prescription_id').values_list(
+            'prescription_id', 'drug_id', 'prescription__patient_id', 'prescription__patient__date_of_birth'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            for column, value in zip(columns, row):
+                column.append(value)
+        prescription_ids, drug_ids, patient_ids, dates_of_birth = columns
+        drug_ids = np.array(drug_ids, dtype=np.int64)
+        patient_ids = np.array(patient_ids, dtype=np.int64)
+        ages = np.array([age_on(dob, today) for dob in dates_of_birth], dtype=np.float64)
+
+        first, second = co_prescribed_rows(np.array(prescription_ids, dtype=np.int64))
+        low = np.minimum(drug_ids[first], drug_ids[second])
+        high = np.maximum(drug_ids[first], drug_ids[second])
+        # Stored as drug1 < drug2 (di_ordered_pair); a drug listed twice on a prescription is not a pair
+        distinct = low != high
+        first, low, high = first[distinct], low[distinct], high[distinct]
+
+        # Encode each (low, high) pair as one int64 so np.unique can count them in 1-D
+        drug_base = int(drug_ids.max()) + 1 if len(drug_ids) else 1
+        pair_codes, pair_index, co_prescription_counts = np.unique(
+            low * drug_base + high, return_inverse=True, return_counts=True
+        )
+        pair_count = len(pair_codes)
+        patient_base = int(patient_ids.max()) + 1 if len(patient_ids) else 1
+        pair_patients = np.unique(pair_index * patient_base + patient_ids[first])
+        affected_patients = np.bincount(pair_patients // patient_base, minlength=pair_count)
+        average_ages = np.bincount(pair_index, weights=ages[first], minlength=pair_count) / np.maximum(
+            co_prescription_counts, 1
+        )
+
+        analytics = []
+        for code, count, patients, average_age in zip(
+            pair_codes.tolist(), co_prescription_counts.tolist(), affected_patients.tolist(), average_ages.tolist()
+        ):
+            drug1_id, drug2_id = divmod(code, drug_base)
+            severities = Counter(self.interaction_pairs.get((drug1_id, drug2_id), []))
+            analytics.append(DrugInteractionAnalytics(
+                drug1_id=drug1_id,
+                drug2_id=drug2_id,
+                co_prescription_count=count,
+                interaction_warnings_count=count if severities else 0,
+                severity_distribution={severity: n * count for severity, n in severities.items()},
+                affected_patients_count=patients,
+                average_patient_age=round(average_age, 1),
+            ))
+
+        upsert(DrugInteractionAnalytics, analytics, ['drug1', 'drug2'])
+        current = {(pair.drug1_id, pair.drug2_id) for pair in analytics}
+        DrugInteractionAnalytics.objects.filter(id__in=[
+            pair_id for pair_id, drug1_id, drug2_id
+            in DrugInteractionAnalytics.objects.values_list('id', 'drug1_id', 'drug2_id').iterator(chunk_size=CHUNK_SIZE)
+            if (drug1_id, drug2_id) not in current
+        ]).delete()
+        self.stdout.write(f'Refreshed interaction analytics for {len(analytics)} drug pairs')
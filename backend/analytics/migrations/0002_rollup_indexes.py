@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('drugs', '0007_interaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='druginteractionanalytics',
+            index=models.Index(fields=['-co_prescription_count'], name='dia_co_rx_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescriptionanalytics',
+            index=models.Index(fields=['date'], include=('total_prescriptions', 'active_prescriptions', 'average_adherence_score'), name='pa_date_covering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usagestatistics',
+            index=models.Index(fields=['drug', '-date'], name='us_drug_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usagestatistics',
+            index=models.Index(fields=['-date', '-prescriptions_count'], name='us_date_count_idx'),
+        ),
+    ]
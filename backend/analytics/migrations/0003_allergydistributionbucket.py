@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_rollup_indexes'),
+        ('drugs', '0007_interaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllergyDistributionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_type', models.CharField(choices=[('gender', 'Gender'), ('severity', 'Severity'), ('drug_conflict', 'Drug Conflict')], max_length=20)),
+                ('key', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+                ('allergy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distribution_buckets', to='drugs.allergy')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_type', 'key'], name='adb_type_key_idx')],
+                'unique_together': {('allergy', 'bucket_type', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:12
+
+from django.db import migrations
+
+
+def copy_json_distributions(apps, schema_editor):
+    AllergyPatternAnalysis = apps.get_model('analytics', 'AllergyPatternAnalysis')
+    AllergyDistributionBucket = apps.get_model('analytics', 'AllergyDistributionBucket')
+
+    buckets = []
+    for pattern in AllergyPatternAnalysis.objects.iterator(chunk_size=500):
+        for key, count in (pattern.gender_distribution or {}).items():
+            buckets.append(AllergyDistributionBucket(
+                allergy_id=pattern.allergy_id, bucket_type='gender', key=key, count=count
+            ))
+        for key, count in (pattern.severity_distribution or {}).items():
+            buckets.append(AllergyDistributionBucket(
+                allergy_id=pattern.allergy_id, bucket_type='severity', key=key, count=count
+            ))
+        for drug_name in pattern.common_drug_conflicts or []:
+            buckets.append(AllergyDistributionBucket(
+                allergy_id=pattern.allergy_id, bucket_type='drug_conflict', key=drug_name,
+                count=pattern.total_patients_with_allergy
+            ))
+        if len(buckets) >= 500:
+            AllergyDistributionBucket.objects.bulk_create(buckets, ignore_conflicts=True)
+            buckets = []
+    AllergyDistributionBucket.objects.bulk_create(buckets, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_allergydistributionbucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_json_distributions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,223 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_backfill_allergy_buckets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='allergydistributionbucket',
+            name='count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='allergypatternanalysis',
+            name='percentage_of_population',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='allergypatternanalysis',
+            name='total_patients_with_allergy',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='adverse_events_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='affected_patients_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='average_patient_age',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='co_prescription_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='dose_adjustments_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='interaction_warnings_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='druginteractionanalytics',
+            name='therapy_changes_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='active_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='allergy_warnings_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='analgesics_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='antibiotics_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='antidiabetics_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='antihypertensives_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='average_adherence_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='cancelled_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='completed_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='drug_interaction_warnings_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='duplicate_therapy_warnings_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='expired_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='low_adherence_patients_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='other_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='statins_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='prescriptionanalytics',
+            name='total_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='safetyscoreanalytics',
+            name='average_safety_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='safetyscoreanalytics',
+            name='contraindicated_prescriptions',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='safetyscoreanalytics',
+            name='high_safety_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='safetyscoreanalytics',
+            name='low_safety_prescriptions',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='safetyscoreanalytics',
+            name='medium_safety_prescriptions',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='adult_usage',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='allergy_conflicts_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='average_adherence_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='average_dosage',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='average_duration_days',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='average_safety_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='geriatric_usage',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='interaction_warnings_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='pediatric_usage',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='prescriptions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='usagestatistics',
+            name='total_quantity_prescribed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
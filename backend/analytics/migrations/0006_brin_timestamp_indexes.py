@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:20
+
+from django.db import migrations
+
+
+# BRIN indexes are PostgreSQL-only, so they are created here rather than in
+# Meta.indexes (which would also be emitted on SQLite development databases).
+BRIN_INDEXES = [
+    ('PrescriptionAnalytics', 'created_at', 'pa_created_brin'),
+    ('SafetyScoreAnalytics', 'created_at', 'ssa_created_brin'),
+    ('UsageStatistics', 'created_at', 'us_created_brin'),
+    ('AllergyPatternAnalysis', 'last_updated', 'apa_updated_brin'),
+    ('DrugInteractionAnalytics', 'last_updated', 'dia_updated_brin'),
+]
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, column, index_name in BRIN_INDEXES:
+        table = apps.get_model('analytics', model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING brin ({column}) '
+            f'WITH (pages_per_range = 32)'
+        )
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, index_name in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_narrow_rollup_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:16
+
+from django.db import migrations, models
+from django.db.models import Exists, F, OuterRef
+
+
+def canonicalize_pairs(apps, schema_editor):
+    """Store every interaction pair once, as drug1 < drug2. unique_together allowed both (A, B) and (B, A);
+    the reversed duplicate is dropped (refresh_analytics rebuilds the counts) before the rest are swapped"""
+    DrugInteractionAnalytics = apps.get_model('analytics', 'DrugInteractionAnalytics')
+    DrugInteractionAnalytics.objects.filter(drug1=F('drug2')).delete()
+    reversed_pairs = DrugInteractionAnalytics.objects.filter(drug1__gt=F('drug2'))
+    reversed_pairs.filter(Exists(DrugInteractionAnalytics.objects.filter(
+        drug1=OuterRef('drug2'), drug2=OuterRef('drug1')
+    ))).delete()
+    # Both columns are assigned from the pre-update row, so this swaps them in one UPDATE
+    reversed_pairs.update(drug1=F('drug2'), drug2=F('drug1'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_brin_timestamp_indexes'),
+        ('drugs', '0007_interaction'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='allergydistributionbucket',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='druginteractionanalytics',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='prescriptionanalytics',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='safetyscoreanalytics',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='usagestatistics',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='safetyscoreanalytics',
+            index=models.Index(condition=models.Q(('contraindicated_prescriptions__gt', 0)), fields=['date'], name='ssa_contra_partial'),
+        ),
+        migrations.AddConstraint(
+            model_name='allergydistributionbucket',
+            constraint=models.UniqueConstraint(fields=('allergy', 'bucket_type', 'key'), name='adb_allergy_type_key_uq'),
+        ),
+        migrations.RunPython(canonicalize_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='druginteractionanalytics',
+            constraint=models.CheckConstraint(condition=models.Q(('drug1__lt', models.F('drug2'))), name='di_ordered_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='druginteractionanalytics',
+            constraint=models.UniqueConstraint(fields=('drug1', 'drug2'), name='di_pair_uq'),
+        ),
+        migrations.AddConstraint(
+            model_name='prescriptionanalytics',
+            constraint=models.UniqueConstraint(fields=('date',), name='pa_date_uq'),
+        ),
+        migrations.AddConstraint(
+            model_name='safetyscoreanalytics',
+            constraint=models.UniqueConstraint(fields=('date',), name='ssa_date_uq'),
+        ),
+        migrations.AddConstraint(
+            model_name='usagestatistics',
+            constraint=models.UniqueConstraint(fields=('date', 'drug'), name='us_date_drug_uq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:17
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_drug_category(apps, schema_editor):
+    UsageStatistics = apps.get_model('analytics', 'UsageStatistics')
+    Drug = apps.get_model('drugs', 'Drug')
+    UsageStatistics.objects.update(
+        drug_category=Subquery(Drug.objects.filter(pk=OuterRef('drug_id')).values('category')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_unique_constraints'),
+        ('drugs', '0007_interaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usagestatistics',
+            name='drug_category',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='usagestatistics',
+            index=models.Index(fields=['drug_category', '-date', '-prescriptions_count'], name='us_category_date_idx'),
+        ),
+        migrations.RunPython(copy_drug_category, migrations.RunPython.noop),
+    ]
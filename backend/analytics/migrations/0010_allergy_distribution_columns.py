@@ -0,0 +1,98 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:26
+
+from django.db import migrations, models
+
+
+GENDER_COUNT_FIELDS = {'M': 'male_count', 'F': 'female_count', 'O': 'other_count'}
+SEVERITY_COUNT_FIELDS = {'mild': 'mild_count', 'moderate': 'moderate_count', 'severe': 'severe_count'}
+
+
+def copy_json_distributions(apps, schema_editor):
+    AllergyPatternAnalysis = apps.get_model('analytics', 'AllergyPatternAnalysis')
+    AllergyDistributionBucket = apps.get_model('analytics', 'AllergyDistributionBucket')
+
+    patterns = list(AllergyPatternAnalysis.objects.all())
+    for pattern in patterns:
+        for distribution, fields in (
+            (pattern.gender_distribution or {}, GENDER_COUNT_FIELDS),
+            (pattern.severity_distribution or {}, SEVERITY_COUNT_FIELDS),
+        ):
+            for key, field in fields.items():
+                setattr(pattern, field, distribution.get(key, 0))
+    AllergyPatternAnalysis.objects.bulk_update(
+        patterns, [*GENDER_COUNT_FIELDS.values(), *SEVERITY_COUNT_FIELDS.values()], batch_size=500
+    )
+    # Gender and severity now live on the columns above; buckets only keep drug conflicts
+    AllergyDistributionBucket.objects.filter(bucket_type__in=['gender', 'severity']).delete()
+
+
+def restore_json_distributions(apps, schema_editor):
+    AllergyPatternAnalysis = apps.get_model('analytics', 'AllergyPatternAnalysis')
+    AllergyDistributionBucket = apps.get_model('analytics', 'AllergyDistributionBucket')
+
+    patterns = list(AllergyPatternAnalysis.objects.all())
+    buckets = []
+    for pattern in patterns:
+        for bucket_type, fields in (('gender', GENDER_COUNT_FIELDS), ('severity', SEVERITY_COUNT_FIELDS)):
+            distribution = {key: getattr(pattern, field) for key, field in fields.items()}
+            setattr(pattern, f'{bucket_type}_distribution', distribution)
+            buckets.extend(
+                AllergyDistributionBucket(allergy_id=pattern.allergy_id, bucket_type=bucket_type, key=key, count=count)
+                for key, count in distribution.items()
+            )
+    AllergyPatternAnalysis.objects.bulk_update(patterns, ['gender_distribution', 'severity_distribution'], batch_size=500)
+    AllergyDistributionBucket.objects.bulk_create(buckets, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0008_usagestatistics_drug_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='female_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='male_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='mild_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='moderate_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='other_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='allergypatternanalysis',
+            name='severe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(copy_json_distributions, restore_json_distributions),
+        migrations.RemoveField(
+            model_name='allergypatternanalysis',
+            name='gender_distribution',
+        ),
+        migrations.RemoveField(
+            model_name='allergypatternanalysis',
+            name='severity_distribution',
+        ),
+        migrations.AlterField(
+            model_name='allergydistributionbucket',
+            name='bucket_type',
+            field=models.CharField(choices=[('drug_conflict', 'Drug Conflict')], max_length=20),
+        ),
+    ]
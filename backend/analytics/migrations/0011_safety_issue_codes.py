@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:28
+
+from django.db import migrations
+
+
+# Sentence suffixes previously written to top_safety_issues, e.g. "3 contraindicated prescriptions"
+ISSUE_CODES = {
+    'contraindicated prescriptions': 'contraindicated',
+    'low safety prescriptions': 'low_safety',
+}
+
+
+def convert_issue_text_to_codes(apps, schema_editor):
+    SafetyScoreAnalytics = apps.get_model('analytics', 'SafetyScoreAnalytics')
+
+    rollups = list(SafetyScoreAnalytics.objects.exclude(top_safety_issues=[]))
+    for rollup in rollups:
+        rollup.top_safety_issues = [
+            next((code for suffix, code in ISSUE_CODES.items() if issue.endswith(suffix)), issue)
+            for issue in rollup.top_safety_issues
+        ]
+    SafetyScoreAnalytics.objects.bulk_update(rollups, ['top_safety_issues'], batch_size=500)
+
+
+# A jsonb_path_ops GIN index serves top_safety_issues__contains=[...] (jsonb @>) lookups.
+# PostgreSQL-only, so it is created here rather than in Meta.indexes.
+def create_issue_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('analytics', 'SafetyScoreAnalytics')._meta.db_table
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS ssa_issues_gin ON {table} USING gin (top_safety_issues jsonb_path_ops)'
+    )
+
+
+def drop_issue_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ssa_issues_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_allergy_distribution_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_issue_text_to_codes, migrations.RunPython.noop),
+        migrations.RunPython(create_issue_gin_index, drop_issue_gin_index),
+    ]
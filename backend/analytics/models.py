@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, Q
 from django.conf import settings
 from patients.models import Patient
 from drugs.models import Drug, Allergy
@@ -8,34 +9,44 @@ from rx.models import Prescription, PrescriptionMedication
 class PrescriptionAnalytics(models.Model):
     """Store aggregated prescription analytics data"""
     date = models.DateField()
-    total_prescriptions = models.IntegerField(default=0)
-    active_prescriptions = models.IntegerField(default=0)
-    completed_prescriptions = models.IntegerField(default=0)
-    cancelled_prescriptions = models.IntegerField(default=0)
-    expired_prescriptions = models.IntegerField(default=0)
+    total_prescriptions = models.PositiveIntegerField(default=0)
+    active_prescriptions = models.PositiveIntegerField(default=0)
+    completed_prescriptions = models.PositiveIntegerField(default=0)
+    cancelled_prescriptions = models.PositiveIntegerField(default=0)
+    expired_prescriptions = models.PositiveIntegerField(default=0)
     
     # Drug category breakdown
-    antibiotics_count = models.IntegerField(default=0)
-    analgesics_count = models.IntegerField(default=0)
-    antihypertensives_count = models.IntegerField(default=0)
-    antidiabetics_count = models.IntegerField(default=0)
-    statins_count = models.IntegerField(default=0)
-    other_count = models.IntegerField(default=0)
+    antibiotics_count = models.PositiveIntegerField(default=0)
+    analgesics_count = models.PositiveIntegerField(default=0)
+    antihypertensives_count = models.PositiveIntegerField(default=0)
+    antidiabetics_count = models.PositiveIntegerField(default=0)
+    statins_count = models.PositiveIntegerField(default=0)
+    other_count = models.PositiveIntegerField(default=0)
     
     # Safety metrics
-    allergy_warnings_count = models.IntegerField(default=0)
-    drug_interaction_warnings_count = models.IntegerField(default=0)
-    duplicate_therapy_warnings_count = models.IntegerField(default=0)
+    allergy_warnings_count = models.PositiveSmallIntegerField(default=0)
+    drug_interaction_warnings_count = models.PositiveSmallIntegerField(default=0)
+    duplicate_therapy_warnings_count = models.PositiveSmallIntegerField(default=0)
     
     # Adherence metrics
-    average_adherence_score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
-    low_adherence_patients_count = models.IntegerField(default=0)
+    average_adherence_score = models.FloatField(default=0.0)
+    low_adherence_patients_count = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ('date',)
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date'], name='pa_date_uq'),
+        ]
+        indexes = [
+            # Lets the trends dashboard answer headline counts with an index-only scan (PostgreSQL)
+            models.Index(
+                fields=['date'],
+                include=['total_prescriptions', 'active_prescriptions', 'average_adherence_score'],
+                name='pa_date_covering_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Analytics for {self.date}"
@@ -43,13 +54,26 @@ class PrescriptionAnalytics(models.Model):
 
 class AllergyPatternAnalysis(models.Model):
     """Analyze allergy patterns across patients"""
+    # Distribution keys mapped to the count column that stores them
+    GENDER_COUNT_FIELDS = {'M': 'male_count', 'F': 'female_count', 'O': 'other_count'}
+    SEVERITY_COUNT_FIELDS = {'mild': 'mild_count', 'moderate': 'moderate_count', 'severe': 'severe_count'}
+    
     allergy = models.ForeignKey(Allergy, on_delete=models.CASCADE)
-    total_patients_with_allergy = models.IntegerField(default=0)
-    percentage_of_population = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    total_patients_with_allergy = models.PositiveIntegerField(default=0)
+    percentage_of_population = models.FloatField(default=0.0)
     most_common_age_group = models.CharField(max_length=20, blank=True, null=True)
-    gender_distribution = models.JSONField(default=dict)  # {'M': 45, 'F': 55}
     common_drug_conflicts = models.JSONField(default=list)  # List of drug names
-    severity_distribution = models.JSONField(default=dict)  # {'mild': 30, 'moderate': 50, 'severe': 20}
+    
+    # Gender distribution
+    male_count = models.PositiveIntegerField(default=0)
+    female_count = models.PositiveIntegerField(default=0)
+    other_count = models.PositiveIntegerField(default=0)
+    
+    # Severity distribution
+    mild_count = models.PositiveIntegerField(default=0)
+    moderate_count = models.PositiveIntegerField(default=0)
+    severe_count = models.PositiveIntegerField(default=0)
+    
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -57,28 +81,69 @@ class AllergyPatternAnalysis(models.Model):
     
     def __str__(self):
         return f"{self.allergy.name} - {self.total_patients_with_allergy} patients"
+    
+    @property
+    def gender_distribution(self):
+        return {key: getattr(self, field) for key, field in self.GENDER_COUNT_FIELDS.items()}
+    
+    @property
+    def severity_distribution(self):
+        return {key: getattr(self, field) for key, field in self.SEVERITY_COUNT_FIELDS.items()}
+
+
+class AllergyDistributionBucket(models.Model):
+    """Per-allergy distribution counts, one row per (bucket_type, key)"""
+    BUCKET_TYPE_CHOICES = [
+        ('drug_conflict', 'Drug Conflict'),
+    ]
+    
+    allergy = models.ForeignKey(Allergy, on_delete=models.CASCADE, related_name='distribution_buckets')
+    bucket_type = models.CharField(max_length=20, choices=BUCKET_TYPE_CHOICES)
+    key = models.CharField(max_length=200)  # Drug name
+    count = models.PositiveIntegerField(default=0)  # For drug conflicts: patients with the allergy
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['allergy', 'bucket_type', 'key'], name='adb_allergy_type_key_uq'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_type', 'key'], name='adb_type_key_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.allergy.name} {self.bucket_type}:{self.key} ({self.count})"
 
 
 class SafetyScoreAnalytics(models.Model):
     """Track safety scores and trends"""
+    # Issue codes stored in top_safety_issues; the counts live in the columns below
+    CONTRAINDICATED_ISSUE = 'contraindicated'
+    LOW_SAFETY_ISSUE = 'low_safety'
+    
     date = models.DateField()
-    average_safety_score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
-    high_safety_prescriptions = models.IntegerField(default=0)  # Score >= 0.8
-    medium_safety_prescriptions = models.IntegerField(default=0)  # Score 0.6-0.79
-    low_safety_prescriptions = models.IntegerField(default=0)  # Score < 0.6
-    contraindicated_prescriptions = models.IntegerField(default=0)  # Score = 0
+    average_safety_score = models.FloatField(default=0.0)
+    high_safety_prescriptions = models.PositiveIntegerField(default=0)  # Score >= 0.8
+    medium_safety_prescriptions = models.PositiveIntegerField(default=0)  # Score 0.6-0.79
+    low_safety_prescriptions = models.PositiveSmallIntegerField(default=0)  # Score < 0.6
+    contraindicated_prescriptions = models.PositiveSmallIntegerField(default=0)  # Score = 0
     
     # Safety score breakdown by drug category
     safety_by_category = models.JSONField(default=dict)
     
-    # Common safety issues
+    # Common safety issues, e.g. ['contraindicated', 'low_safety']
     top_safety_issues = models.JSONField(default=list)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ('date',)
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['date'], name='ssa_date_uq'),
+        ]
+        indexes = [
+            # Only the days with contraindicated prescriptions, for the "problem days" view
+            models.Index(fields=['date'], condition=Q(contraindicated_prescriptions__gt=0), name='ssa_contra_partial'),
+        ]
     
     def __str__(self):
         return f"Safety Analytics for {self.date}"
@@ -88,31 +153,39 @@ class UsageStatistics(models.Model):
     """Track medication usage statistics"""
     date = models.DateField()
     drug = models.ForeignKey(Drug, on_delete=models.CASCADE)
+    drug_category = models.CharField(max_length=100, default='')  # Copy of Drug.category, avoids the join
     
     # Usage metrics
-    prescriptions_count = models.IntegerField(default=0)
-    total_quantity_prescribed = models.IntegerField(default=0)
-    average_dosage = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
-    average_duration_days = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    prescriptions_count = models.PositiveIntegerField(default=0)
+    total_quantity_prescribed = models.PositiveIntegerField(default=0)
+    average_dosage = models.FloatField(default=0.0)
+    average_duration_days = models.FloatField(default=0.0)
     
     # Patient demographics
-    pediatric_usage = models.IntegerField(default=0)  # Age < 18
-    adult_usage = models.IntegerField(default=0)      # Age 18-65
-    geriatric_usage = models.IntegerField(default=0)  # Age > 65
+    pediatric_usage = models.PositiveIntegerField(default=0)  # Age < 18
+    adult_usage = models.PositiveIntegerField(default=0)      # Age 18-65
+    geriatric_usage = models.PositiveIntegerField(default=0)  # Age > 65
     
     # Safety metrics
-    allergy_conflicts_count = models.IntegerField(default=0)
-    interaction_warnings_count = models.IntegerField(default=0)
-    average_safety_score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    allergy_conflicts_count = models.PositiveSmallIntegerField(default=0)
+    interaction_warnings_count = models.PositiveSmallIntegerField(default=0)
+    average_safety_score = models.FloatField(default=0.0)
     
     # Adherence metrics
-    average_adherence_score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    average_adherence_score = models.FloatField(default=0.0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ('date', 'drug')
         ordering = ['-date', '-prescriptions_count']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'drug'], name='us_date_drug_uq'),
+        ]
+        indexes = [
+            models.Index(fields=['drug', '-date'], name='us_drug_date_idx'),
+            models.Index(fields=['-date', '-prescriptions_count'], name='us_date_count_idx'),
+            models.Index(fields=['drug_category', '-date', '-prescriptions_count'], name='us_category_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.drug.name} - {self.date} ({self.prescriptions_count} prescriptions)"
@@ -124,24 +197,31 @@ class DrugInteractionAnalytics(models.Model):
     drug2 = models.ForeignKey(Drug, on_delete=models.CASCADE, related_name='interaction_analytics_as_drug2')
     
     # Interaction frequency
-    co_prescription_count = models.IntegerField(default=0)
-    interaction_warnings_count = models.IntegerField(default=0)
+    co_prescription_count = models.PositiveIntegerField(default=0)
+    interaction_warnings_count = models.PositiveIntegerField(default=0)
     severity_distribution = models.JSONField(default=dict)  # {'minor': 10, 'moderate': 25, 'major': 5}
     
     # Patient impact
-    affected_patients_count = models.IntegerField(default=0)
-    average_patient_age = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
+    affected_patients_count = models.PositiveIntegerField(default=0)
+    average_patient_age = models.FloatField(default=0.0)
     
     # Clinical outcomes
-    dose_adjustments_count = models.IntegerField(default=0)
-    therapy_changes_count = models.IntegerField(default=0)
-    adverse_events_count = models.IntegerField(default=0)
+    dose_adjustments_count = models.PositiveSmallIntegerField(default=0)
+    therapy_changes_count = models.PositiveSmallIntegerField(default=0)
+    adverse_events_count = models.PositiveSmallIntegerField(default=0)
     
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
-        unique_together = ('drug1', 'drug2')
         ordering = ['-co_prescription_count']
+        constraints = [
+            # (A, B) and (B, A) are the same pair, always stored as drug1 < drug2
+            models.CheckConstraint(condition=Q(drug1__lt=F('drug2')), name='di_ordered_pair'),
+            models.UniqueConstraint(fields=['drug1', 'drug2'], name='di_pair_uq'),
+        ]
+        indexes = [
+            models.Index(fields=['-co_prescription_count'], name='dia_co_rx_count_idx'),
+        ]
     
     def __str__(self):
         return f"{self.drug1.name} + {self.drug2.name} ({self.co_prescription_count} co-prescriptions)"
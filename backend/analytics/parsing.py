@@ -0,0 +1,19 @@
+import re
+
+
+# '500', '500mg', '0.5 mcg' -> the numeric amount
+DOSAGE_RE = re.compile(r'\s*(\d+(?:\.\d*)?|\.\d+)\s*(?:mg|mcg)?\s*')
+# '7 days', '10 day(s)' -> the leading number of days
+DURATION_RE = re.compile(r'\s*(\d+)\s*day', re.IGNORECASE)
+
+
+def parse_dosage(dosage):
+    """Dosage amount as a float, or None when the text is not a plain mg/mcg amount"""
+    match = DOSAGE_RE.fullmatch(dosage or '')
+    return float(match.group(1)) if match else None
+
+
+def parse_duration_days(duration):
+    """Duration in days, or None when the text does not start with a number of days"""
+    match = DURATION_RE.match(duration or '')
+    return int(match.group(1)) if match else None
@@ -0,0 +1,43 @@
+from django.db.models import Case, Exists, FloatField, OuterRef, Q, Value, When
+
+from patients.models import PatientAllergy
+
+
+def age_on(date_of_birth, day):
+    """Patient age in whole years on the given day"""
+    return day.year - date_of_birth.year - ((day.month, day.day) < (date_of_birth.month, date_of_birth.day))
+
+
+def years_before(day, years):
+    """The same calendar day the given number of years earlier (Feb 29 falls back to Feb 28)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def safety_score_expression(day):
+    """SQL expression scoring a PrescriptionMedication row on the given day.
+
+    Same rules as the refresh command's safety_scores(): an allergy conflict with the
+    patient scores 0, contraindications scale by 0.9, patients under 12 on a drug that
+    is not pediatric-safe by 0.9 and patients over 65 by 0.95.
+    """
+    date_of_birth = 'prescription__patient__date_of_birth'
+    has_allergy_conflict = Exists(PatientAllergy.objects.filter(
+        patient=OuterRef('prescription__patient'), allergy__conflicting_drugs=OuterRef('drug')
+    ))
+    contraindication_factor = Case(
+        When(Q(drug__contraindications__isnull=False) & ~Q(drug__contraindications=''), then=Value(0.9)),
+        default=Value(1.0),
+    )
+    age_factor = Case(
+        When(Q(**{f'{date_of_birth}__gt': years_before(day, 12)}, drug__pediatric_safe=False), then=Value(0.9)),
+        When(**{f'{date_of_birth}__lte': years_before(day, 66)}, then=Value(0.95)),
+        default=Value(1.0),
+    )
+    return Case(
+        When(has_allergy_conflict, then=Value(0.0)),
+        default=contraindication_factor * age_factor,
+        output_field=FloatField(),
+    )
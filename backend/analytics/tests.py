@@ -0,0 +1,178 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from io import StringIO
+from itertools import combinations
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from analytics.models import DrugInteractionAnalytics, SafetyScoreAnalytics, UsageStatistics
+from analytics.scoring import age_on, safety_score_expression, years_before
+from drugs.models import Allergy, Drug, Interaction
+from patients.models import Patient, PatientAllergy
+from rx.models import Prescription, PrescriptionMedication
+
+User = get_user_model()
+
+
+def expected_safety_score(medication, day):
+    """Score one medication row by row with the rules safety_score_expression and safety_scores() implement"""
+    patient, drug = medication.prescription.patient, medication.drug
+    if PatientAllergy.objects.filter(patient=patient, allergy__conflicting_drugs=drug).exists():
+        return 0.0
+    score = 0.9 if drug.contraindications else 1.0
+    age = age_on(patient.date_of_birth, day)
+    if age < 12 and not drug.pediatric_safe:
+        score *= 0.9
+    elif age > 65:
+        score *= 0.95
+    return score
+
+
+class AnalyticsDataMixin:
+    """Three patients (a child allergic to penicillin, an adult, a senior) with prescriptions
+    over the last two days that mix interacting, contraindicated and repeated drugs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        penicillin = Allergy.objects.create(name='Penicillin')
+
+        def drug(name, category, **fields):
+            return Drug.objects.create(
+                name=name, generic_name=name.lower(), strength='500mg', form='tablet', category=category,
+                manufacturer='Acme', dosage_instructions='Twice daily', **fields
+            )
+
+        cls.drugs = [
+            drug('Amoxicillin', 'Antibiotic', pediatric_safe=False),
+            drug('Ibuprofen', 'Analgesic'),
+            drug('Warfarin', 'Anticoagulant', contraindications='Active bleeding'),
+            drug('Lisinopril', 'Antihypertensive', pediatric_safe=False),
+            drug('Metformin', 'Antidiabetic', contraindications='Renal failure'),
+        ]
+        cls.drugs[0].allergy_conflicts.add(penicillin)
+        interaction = Interaction.objects.create(name='Bleeding risk', description='NSAID and warfarin', severity='High')
+        interaction.drugs.add(cls.drugs[1], cls.drugs[2])
+
+        def patient(first_name, years_old):
+            return Patient.objects.create(
+                first_name=first_name, last_name='Roe', date_of_birth=years_before(cls.today, years_old) - timedelta(days=30),
+                gender='F', phone='1', address='a'
+            )
+
+        child, adult, senior = patient('Child', 8), patient('Adult', 40), patient('Senior', 70)
+        PatientAllergy.objects.create(patient=child, allergy=penicillin, severity='severe')
+        cls.patients = [child, adult, senior]
+
+        for days_ago, prescribed_patient, drug_indexes in [
+            (0, child, [0, 1]),
+            (0, adult, [1, 2, 3]),
+            (0, senior, [2, 4, 1]),
+            (1, senior, [3, 4]),
+            (1, adult, [0, 1, 1]),
+            (1, child, [4, 3]),
+        ]:
+            cls.prescribe(prescribed_patient, [cls.drugs[i] for i in drug_indexes], cls.today - timedelta(days=days_ago))
+
+    @classmethod
+    def prescribe(cls, patient, drugs, day):
+        prescription = Prescription.objects.create(
+            patient=patient, prescriber=cls.doctor, prescribed_date=day, expiry_date=day + timedelta(days=30)
+        )
+        PrescriptionMedication.objects.bulk_create([
+            PrescriptionMedication(
+                prescription=prescription, drug=drug, dosage='500mg', frequency='twice daily', duration='7 days', quantity=14
+            )
+            for drug in drugs
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+
+class RefreshAnalyticsTests(AnalyticsDataMixin, TestCase):
+    def refresh(self):
+        call_command('refresh_analytics', days=2, stdout=StringIO())
+
+    def test_interaction_analytics_match_a_brute_force_count(self):
+        self.refresh()
+        expected = defaultdict(lambda: {'count': 0, 'patients': set(), 'ages': []})
+        for prescription in Prescription.objects.select_related('patient'):
+            drug_ids = list(prescription.prescription_medications.values_list('drug_id', flat=True))
+            for first, second in combinations(drug_ids, 2):
+                if first == second:
+                    continue
+                pair = expected[min(first, second), max(first, second)]
+                pair['count'] += 1
+                pair['patients'].add(prescription.patient_id)
+                pair['ages'].append(age_on(prescription.patient.date_of_birth, self.today))
+
+        interacting = (self.drugs[1].id, self.drugs[2].id)
+        rows = {(row.drug1_id, row.drug2_id): row for row in DrugInteractionAnalytics.objects.all()}
+        self.assertEqual(rows.keys(), expected.keys())
+        for pair, row in rows.items():
+            self.assertEqual(row.co_prescription_count, expected[pair]['count'])
+            self.assertEqual(row.affected_patients_count, len(expected[pair]['patients']))
+            self.assertEqual(row.average_patient_age, round(sum(expected[pair]['ages']) / len(expected[pair]['ages']), 1))
+            if pair == interacting:
+                self.assertEqual(row.interaction_warnings_count, expected[pair]['count'])
+                self.assertEqual(row.severity_distribution, {'High': expected[pair]['count']})
+            else:
+                self.assertEqual(row.interaction_warnings_count, 0)
+                self.assertEqual(row.severity_distribution, {})
+
+    def test_safety_and_usage_rollups_match_per_row_scores(self):
+        self.refresh()
+        for day in (self.today, self.today - timedelta(days=1)):
+            medications = PrescriptionMedication.objects.filter(
+                prescription__prescribed_date=day
+            ).select_related('drug', 'prescription__patient')
+            scores = [(medication.drug, expected_safety_score(medication, day)) for medication in medications]
+
+            rollup = SafetyScoreAnalytics.objects.get(date=day)
+            self.assertAlmostEqual(rollup.average_safety_score, sum(score for _, score in scores) / len(scores))
+            self.assertEqual(rollup.high_safety_prescriptions, sum(score >= 0.8 for _, score in scores))
+            self.assertEqual(rollup.contraindicated_prescriptions, sum(score == 0 for _, score in scores))
+
+            scores_by_drug = defaultdict(list)
+            for drug, score in scores:
+                scores_by_drug[drug.id].append(score)
+            usage = {row.drug_id: row for row in UsageStatistics.objects.filter(date=day)}
+            self.assertEqual(usage.keys(), scores_by_drug.keys())
+            for drug_id, drug_scores in scores_by_drug.items():
+                self.assertEqual(usage[drug_id].prescriptions_count, len(drug_scores))
+                self.assertAlmostEqual(usage[drug_id].average_safety_score, sum(drug_scores) / len(drug_scores))
+
+    def test_query_count_does_not_grow_with_prescriptions(self):
+        # Both measured runs update existing rollup rows rather than create them
+        self.refresh()
+        with CaptureQueriesContext(connection) as before:
+            self.refresh()
+        for patient in self.patients:
+            self.prescribe(patient, self.drugs, self.today)
+            self.prescribe(patient, self.drugs[::-1], self.today - timedelta(days=1))
+        with CaptureQueriesContext(connection) as after:
+            self.refresh()
+        self.assertEqual(len(after), len(before))
+
+
+class SafetyScoreExpressionTests(AnalyticsDataMixin, TestCase):
+    def test_matches_a_per_row_python_score(self):
+        medications = PrescriptionMedication.objects.select_related('drug', 'prescription__patient').annotate(
+            safety_score=safety_score_expression(self.today)
+        )
+        scores = Counter()
+        for medication in medications:
+            expected = expected_safety_score(medication, self.today)
+            self.assertAlmostEqual(medication.safety_score, expected, msg=f'{medication.drug} for {medication.prescription.patient}')
+            scores[expected] += 1
+        # Every rule is exercised: allergy conflict, contraindication, pediatric and geriatric factors
+        self.assertTrue({0.0, 0.9, 0.95, 0.9 * 0.95, 1.0} <= scores.keys())
+
@@ -2,17 +2,270 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Avg, Q, Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Count, Avg, ExpressionWrapper, F, FloatField, Q, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+from operator import itemgetter
+import numpy as np
 from patients.models import Patient, PatientAllergy
-from drugs.models import Drug, Allergy, DrugInteraction
+from drugs.models import Drug, Interaction
 from rx.models import Prescription, PrescriptionMedication, MedicationAdherence, PatientMedicationHistory
+from analytics.allergies import drug_allergy_conflicts
+from analytics.caching import cached_dashboard, cached_rollup_json, encode_json, iter_json
+from analytics.interactions import interacting_pairs
+from analytics.parsing import parse_dosage, parse_duration_days
+from analytics.scoring import age_on, safety_score_expression, years_before
 from analytics.models import PrescriptionAnalytics, AllergyPatternAnalysis, SafetyScoreAnalytics, UsageStatistics, DrugInteractionAnalytics
 
 
+# Rows fetched per round-trip when streaming querysets with .iterator()
+CHUNK_SIZE = 2000
+
+
+def _medications_by_prescription(medications, *fields):
+    """Stream the given fields of each medication, one list of rows per prescription, newest prescription first"""
+    rows = medications.order_by('-prescription__prescribed_date', 'prescription_id', 'id').values_list(
+        'prescription_id', *fields
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for _, group in groupby(rows, key=itemgetter(0)):
+        yield [row[1:] for row in group]
+
+
+def _json_response(payload):
+    """Dashboard JSON encoded with orjson, skipping DRF's renderer; accepts a dict or pre-encoded bytes"""
+    body = payload if isinstance(payload, bytes) else encode_json(payload)
+    return HttpResponse(body, content_type='application/json')
+
+
+def _streaming_json_response(payload, streamed_key):
+    """Dashboard JSON streamed in chunks so the largest section is never encoded as one buffer"""
+    return StreamingHttpResponse(iter_json(payload, streamed_key), content_type='application/json')
+
+
+def _date_range_payload(start_date, end_date, days):
+    return {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'days': days
+    }
+
+
+def _daily_trends(counts_by_day, end_date, days):
+    """Newest-first daily prescription counts from a {date: count} map, zero-filling missing days"""
+    dates = (end_date - timedelta(days=i) for i in range(days))
+    return [{'date': date.strftime('%Y-%m-%d'), 'prescriptions': counts_by_day.get(date, 0)} for date in dates]
+
+
+def _prescription_trends_from_rollups(start_date, end_date, days):
+    """Clinic-wide prescription trends read from the PrescriptionAnalytics rollup table"""
+    rollups = PrescriptionAnalytics.objects.filter(date__range=[start_date, end_date])
+    totals = rollups.aggregate(
+        total=Sum('total_prescriptions'),
+        active=Sum('active_prescriptions'),
+        completed=Sum('completed_prescriptions'),
+        cancelled=Sum('cancelled_prescriptions'),
+        expired=Sum('expired_prescriptions'),
+        antibiotics=Sum('antibiotics_count'),
+        analgesics=Sum('analgesics_count'),
+        antihypertensives=Sum('antihypertensives_count'),
+        antidiabetics=Sum('antidiabetics_count'),
+        statins=Sum('statins_count'),
+        other=Sum('other_count'),
+        allergy_warnings=Sum('allergy_warnings_count'),
+        interaction_warnings=Sum('drug_interaction_warnings_count'),
+        duplicate_therapy_warnings=Sum('duplicate_therapy_warnings_count'),
+        average_adherence=Avg('average_adherence_score'),
+        low_adherence_patients=Sum('low_adherence_patients_count'),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    daily_stats = _daily_trends(dict(rollups.values_list('date', 'total_prescriptions')), end_date, days)
+
+    return {
+        'date_range': _date_range_payload(start_date, end_date, days),
+        'prescription_stats': {
+            'total': totals['total'],
+            'active': totals['active'],
+            'completed': totals['completed'],
+            'cancelled': totals['cancelled'],
+            'expired': totals['expired']
+        },
+        'category_breakdown': {
+            'Antibiotic': totals['antibiotics'],
+            'Analgesic': totals['analgesics'],
+            'Antihypertensive': totals['antihypertensives'],
+            'Antidiabetic': totals['antidiabetics'],
+            'Statin': totals['statins'],
+            'Other': totals['other']
+        },
+        'safety_metrics': {
+            'allergy_warnings': totals['allergy_warnings'],
+            'interaction_warnings': totals['interaction_warnings'],
+            'duplicate_therapy_warnings': totals['duplicate_therapy_warnings']
+        },
+        'adherence_metrics': {
+            'average_adherence_score': round(float(totals['average_adherence']) * 100, 2),
+            'low_adherence_patients_count': totals['low_adherence_patients']
+        },
+        'daily_trends': daily_stats
+    }
+
+
+def _allergy_patterns_from_rollups():
+    """Clinic-wide allergy patterns read from AllergyPatternAnalysis"""
+    total_patients = Patient.objects.count()
+    gender_fields = AllergyPatternAnalysis.GENDER_COUNT_FIELDS
+    severity_fields = AllergyPatternAnalysis.SEVERITY_COUNT_FIELDS
+    patterns = AllergyPatternAnalysis.objects.values(
+        'allergy__name', 'total_patients_with_allergy', 'percentage_of_population', 'most_common_age_group',
+        'common_drug_conflicts', *gender_fields.values(), *severity_fields.values()
+    )
+
+    allergy_patterns = {}
+    for pattern in patterns:
+        allergy_patterns[pattern['allergy__name']] = {
+            'count': pattern['total_patients_with_allergy'],
+            'percentage_of_population': float(pattern['percentage_of_population']),
+            'most_common_age_group': pattern['most_common_age_group'],
+            'gender_distribution': {key: pattern[field] for key, field in gender_fields.items()},
+            'severity_distribution': {key: pattern[field] for key, field in severity_fields.items()},
+            'common_drug_conflicts': pattern['common_drug_conflicts']
+        }
+
+    # Cross-allergy totals are plain integer SUMs over the distribution columns
+    totals = AllergyPatternAnalysis.objects.aggregate(
+        **{field: Sum(field) for field in [*gender_fields.values(), *severity_fields.values()]}
+    )
+
+    total_recorded = sum(stats['count'] for stats in allergy_patterns.values())
+    return {
+        'total_patients': total_patients,
+        'allergies_analyzed': len(allergy_patterns),
+        'allergy_patterns': allergy_patterns,
+        'summary': {
+            'most_common_allergy': next(iter(allergy_patterns), None),
+            'total_allergies_recorded': total_recorded,
+            'average_allergies_per_patient': round(total_recorded / total_patients, 2) if total_patients > 0 else 0,
+            'gender_distribution': {key: totals[field] or 0 for key, field in gender_fields.items()},
+            'severity_distribution': {key: totals[field] or 0 for key, field in severity_fields.items()}
+        }
+    }
+
+
+def _weighted_average(field):
+    """Mean of a per-day average column across rollup rows, weighted by the prescriptions each row covers"""
+    return ExpressionWrapper(
+        Sum(F(field) * F('prescriptions_count'), output_field=FloatField()) / Sum('prescriptions_count'),
+        output_field=FloatField(),
+    )
+
+
+def _safety_scores_from_rollups(start_date, end_date, days):
+    """Clinic-wide safety statistics read from the SafetyScoreAnalytics rollup table"""
+    rollups = SafetyScoreAnalytics.objects.filter(date__range=[start_date, end_date])
+    rows = list(rollups.values_list(
+        'high_safety_prescriptions', 'medium_safety_prescriptions', 'low_safety_prescriptions',
+        'contraindicated_prescriptions', 'average_safety_score'
+    ))
+    if not rows:
+        return {
+            'message': 'No prescriptions found in the specified date range'
+        }
+
+    # One row per day: [high, medium, low, contraindicated, average score]
+    columns = np.array(rows, dtype=np.float64)
+    high_safety, medium_safety, low_safety, contraindicated = (int(total) for total in columns[:, :4].sum(axis=0))
+    total_analyzed = high_safety + medium_safety + low_safety
+
+    # Weight each day's average by the number of medications it scored
+    weighted_sum = float(columns[:, 4] @ columns[:, :3].sum(axis=1))
+
+    # Per-drug daily averages carry their medication counts, so categories can be weighted exactly
+    category_averages = UsageStatistics.objects.filter(date__range=[start_date, end_date]).values_list(
+        'drug_category'
+    ).annotate(average=_weighted_average('average_safety_score')).order_by()
+
+    top_issues = []
+    if contraindicated > 0:
+        top_issues.append(f"{contraindicated} contraindicated prescriptions")
+    if low_safety > 0:
+        top_issues.append(f"{low_safety} low safety prescriptions")
+
+    return {
+        'date_range': _date_range_payload(start_date, end_date, days),
+        'overall_stats': {
+            'average_safety_score': round(weighted_sum / total_analyzed, 3) if total_analyzed else 0,
+            'high_safety_prescriptions': high_safety,
+            'medium_safety_prescriptions': medium_safety,
+            'low_safety_prescriptions': low_safety,
+            'contraindicated_prescriptions': contraindicated,
+            'total_prescriptions_analyzed': total_analyzed
+        },
+        'safety_by_category': {
+            category: round(float(average), 3) for category, average in category_averages
+        },
+        'top_safety_issues': top_issues
+    }
+
+
+def _usage_statistics_from_rollups(start_date, end_date, days):
+    """Clinic-wide medication usage read from the UsageStatistics rollup table"""
+    usage_rollups = UsageStatistics.objects.filter(date__range=[start_date, end_date])
+    rows = usage_rollups.values(
+        'drug_id', 'drug__name', 'drug_category', 'drug__therapeutic_class'
+    ).annotate(
+        # Not named prescriptions_count, which would shadow the column _weighted_average reads
+        prescriptions=Sum('prescriptions_count'),
+        total_quantity=Sum('total_quantity_prescribed'),
+        pediatric_usage=Sum('pediatric_usage'),
+        adult_usage=Sum('adult_usage'),
+        geriatric_usage=Sum('geriatric_usage'),
+        allergy_conflicts=Sum('allergy_conflicts_count'),
+        interaction_warnings=Sum('interaction_warnings_count'),
+        average_dosage=_weighted_average('average_dosage'),
+        average_duration_days=_weighted_average('average_duration_days'),
+        average_safety_score=_weighted_average('average_safety_score'),
+        average_adherence_score=_weighted_average('average_adherence_score'),
+    ).order_by('-prescriptions')
+
+    usage = {}
+    for row in rows:
+        usage[row['drug__name']] = {
+            'drug_id': row['drug_id'],
+            'category': row['drug_category'],
+            'therapeutic_class': row['drug__therapeutic_class'],
+            'prescriptions_count': row['prescriptions'],
+            'total_quantity': row['total_quantity'],
+            'pediatric_usage': row['pediatric_usage'],
+            'adult_usage': row['adult_usage'],
+            'geriatric_usage': row['geriatric_usage'],
+            'allergy_conflicts': row['allergy_conflicts'],
+            'interaction_warnings': row['interaction_warnings'],
+            'average_dosage': round(float(row['average_dosage']), 2),
+            'average_duration_days': round(float(row['average_duration_days']), 2),
+            'average_safety_score': round(float(row['average_safety_score']), 3),
+            'average_adherence_score': round(float(row['average_adherence_score']), 3),
+        }
+
+    return {
+        'date_range': _date_range_payload(start_date, end_date, days),
+        'summary': {
+            'total_drugs_analyzed': len(usage),
+            'total_prescriptions': sum(stats['prescriptions_count'] for stats in usage.values()),
+            'most_prescribed_drug': next(iter(usage), None)
+        },
+        'category_breakdown': dict(
+            usage_rollups.values_list('drug_category').annotate(total=Sum('prescriptions_count')).order_by('-total')
+        ),
+        'usage_statistics': usage
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('prescription-trends')
 def prescription_trends_dashboard(request):
     """Get comprehensive prescription trends and analytics"""
     try:
@@ -21,48 +274,44 @@ def prescription_trends_dashboard(request):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
+        # Clinic-wide figures come straight from the nightly rollups
+        if request.GET.get('scope') == 'clinic':
+            return _json_response(cached_rollup_json('prescription-trends', _prescription_trends_from_rollups, start_date, end_date, days))
+        
         # Get prescriptions in date range
         prescriptions = Prescription.objects.filter(
             prescribed_date__range=[start_date, end_date],
             prescriber=request.user
         )
+        medications = PrescriptionMedication.objects.filter(prescription__in=prescriptions)
         
         # Basic prescription stats
-        total_prescriptions = prescriptions.count()
-        active_prescriptions = prescriptions.filter(status='active').count()
-        completed_prescriptions = prescriptions.filter(status='completed').count()
-        cancelled_prescriptions = prescriptions.filter(status='cancelled').count()
-        expired_prescriptions = prescriptions.filter(status='expired').count()
+        prescription_stats = prescriptions.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='active')),
+            completed=Count('id', filter=Q(status='completed')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            expired=Count('id', filter=Q(status='expired')),
+        )
         
         # Drug category breakdown
-        category_stats = {}
-        for prescription in prescriptions:
-            for med in prescription.prescription_medications.all():
-                category = med.drug.category
-                category_stats[category] = category_stats.get(category, 0) + 1
+        category_stats = dict(
+            medications.values_list('drug__category').annotate(count=Count('id')).order_by()
+        )
         
         # Safety metrics
-        allergy_warnings = 0
+        # A medication whose drug conflicts with any of the patient's own allergies
+        allergy_warnings = medications.filter(
+            drug__allergy_conflicts__patient_allergies__patient=F('prescription__patient')
+        ).values('id').distinct().count()
         interaction_warnings = 0
         duplicate_therapy_warnings = 0
+        interaction_pairs = interacting_pairs()
         
-        for prescription in prescriptions:
-            patient = prescription.patient
-            patient_allergies = set(patient.allergies.values_list('id', flat=True))
-            
-            for med in prescription.prescription_medications.all():
-                drug = med.drug
-                # Check allergy conflicts
-                if drug.allergy_conflicts.filter(id__in=patient_allergies).exists():
-                    allergy_warnings += 1
-                
-                # Check drug interactions
-                other_meds = prescription.prescription_medications.exclude(id=med.id)
-                for other_med in other_meds:
-                    if DrugInteraction.objects.filter(
-                        Q(drug1=drug, drug2=other_med.drug) | Q(drug1=other_med.drug, drug2=drug)
-                    ).exists():
-                        interaction_warnings += 1
+        for meds in _medications_by_prescription(medications, 'drug_id'):
+            # Check drug interactions; an interacting pair warns on both of its medications
+            drug_ids = sorted(drug_id for drug_id, in meds)
+            interaction_warnings += 2 * sum(pair in interaction_pairs for pair in combinations(drug_ids, 2))
         
         # Adherence metrics
         adherence_records = MedicationAdherence.objects.filter(
@@ -76,28 +325,18 @@ def prescription_trends_dashboard(request):
         ).count()
         
         # Daily trends
-        daily_stats = []
-        for i in range(days):
-            date = end_date - timedelta(days=i)
-            daily_prescriptions = prescriptions.filter(prescribed_date=date).count()
-            daily_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'prescriptions': daily_prescriptions
-            })
+        daily_counts = dict(
+            prescriptions.values_list('prescribed_date').annotate(count=Count('id')).order_by()
+        )
+        daily_stats = _daily_trends(daily_counts, end_date, days)
         
-        return Response({
+        return _json_response({
             'date_range': {
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
                 'days': days
             },
-            'prescription_stats': {
-                'total': total_prescriptions,
-                'active': active_prescriptions,
-                'completed': completed_prescriptions,
-                'cancelled': cancelled_prescriptions,
-                'expired': expired_prescriptions
-            },
+            'prescription_stats': prescription_stats,
             'category_breakdown': category_stats,
             'safety_metrics': {
                 'allergy_warnings': allergy_warnings,
@@ -119,49 +358,57 @@ def prescription_trends_dashboard(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('allergy-patterns')
 def allergy_pattern_analysis(request):
     """Analyze allergy patterns across patient population"""
     try:
+        if request.GET.get('scope') == 'clinic':
+            return _json_response(cached_rollup_json('allergy-patterns', _allergy_patterns_from_rollups))
+        
         patients = Patient.objects.filter(doctor=request.user)
         total_patients = patients.count()
+        patient_allergies = PatientAllergy.objects.filter(patient__in=patients)
         
-        # Get all allergies and their frequency
+        # Patients per allergy, in patient order; this also fixes the order allergies are listed in
         allergy_stats = {}
-        for patient in patients:
-            for allergy in patient.allergies.all():
-                if allergy.name not in allergy_stats:
-                    allergy_stats[allergy.name] = {
-                        'count': 0,
-                        'patients': [],
-                        'age_groups': {'pediatric': 0, 'adult': 0, 'geriatric': 0},
-                        'gender_distribution': {'M': 0, 'F': 0, 'O': 0},
-                        'severity_distribution': {'mild': 0, 'moderate': 0, 'severe': 0}
-                    }
-                
-                allergy_stats[allergy.name]['count'] += 1
-                allergy_stats[allergy.name]['patients'].append(patient.id)
-                
-                # Age group analysis
-                if patient.age < 18:
-                    allergy_stats[allergy.name]['age_groups']['pediatric'] += 1
-                elif patient.age < 65:
-                    allergy_stats[allergy.name]['age_groups']['adult'] += 1
-                else:
-                    allergy_stats[allergy.name]['age_groups']['geriatric'] += 1
-                
-                # Gender distribution
-                allergy_stats[allergy.name]['gender_distribution'][patient.gender] += 1
-                
-                # Severity analysis (from PatientAllergy)
-                patient_allergy = PatientAllergy.objects.get(patient=patient, allergy=allergy)
-                severity = patient_allergy.severity or 'moderate'
-                allergy_stats[allergy.name]['severity_distribution'][severity] += 1
+        for allergy_name, patient_id in patient_allergies.order_by('-patient__created_at', 'patient_id').values_list(
+            'allergy__name', 'patient_id'
+        ):
+            allergy_stats.setdefault(allergy_name, {'patients': []})['patients'].append(patient_id)
+        
+        # Every count in one GROUP BY allergy with conditional aggregates (a missing severity counts as moderate)
+        today = date.today()
+        pediatric = Q(patient__date_of_birth__gt=years_before(today, 18))
+        geriatric = Q(patient__date_of_birth__lte=years_before(today, 65))
+        gender_counts = {
+            gender: Count('id', filter=Q(patient__gender=gender)) for gender, _ in Patient.GENDER_CHOICES
+        }
+        for row in patient_allergies.values('allergy__name').annotate(
+            count=Count('id'),
+            pediatric=Count('id', filter=pediatric),
+            adult=Count('id', filter=~pediatric & ~geriatric),
+            geriatric=Count('id', filter=geriatric),
+            mild=Count('id', filter=Q(severity='mild')),
+            moderate=Count('id', filter=Q(severity='moderate') | Q(severity__isnull=True) | Q(severity='')),
+            severe=Count('id', filter=Q(severity='severe')),
+            **gender_counts
+        ).order_by():
+            allergy_stats[row['allergy__name']].update({
+                'count': row['count'],
+                'age_groups': {group: row[group] for group in ('pediatric', 'adult', 'geriatric')},
+                'gender_distribution': {gender: row[gender] for gender in gender_counts},
+                'severity_distribution': {severity: row[severity] for severity in ('mild', 'moderate', 'severe')}
+            })
         
         # Find common drug conflicts for each allergy
+        conflicting_drugs = defaultdict(list)
+        for allergy_name, drug_name in Drug.objects.filter(
+            allergy_conflicts__name__in=allergy_stats.keys()
+        ).values_list('allergy_conflicts__name', 'name'):
+            conflicting_drugs[allergy_name].append(drug_name)
+        
         for allergy_name, stats in allergy_stats.items():
-            allergy = Allergy.objects.get(name=allergy_name)
-            conflicting_drugs = Drug.objects.filter(allergy_conflicts=allergy)
-            stats['common_drug_conflicts'] = list(conflicting_drugs.values_list('name', flat=True)[:5])
+            stats['common_drug_conflicts'] = conflicting_drugs[allergy_name][:5]
             stats['percentage_of_population'] = round((stats['count'] / total_patients) * 100, 2)
             
             # Find most common age group
@@ -171,7 +418,7 @@ def allergy_pattern_analysis(request):
         # Sort by frequency
         sorted_allergies = sorted(allergy_stats.items(), key=lambda x: x[1]['count'], reverse=True)
         
-        return Response({
+        return _json_response({
             'total_patients': total_patients,
             'allergies_analyzed': len(allergy_stats),
             'allergy_patterns': dict(sorted_allergies),
@@ -190,6 +437,7 @@ def allergy_pattern_analysis(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('safety-scores')
 def safety_score_analytics(request):
     """Analyze safety scores and trends"""
     try:
@@ -198,72 +446,43 @@ def safety_score_analytics(request):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        prescriptions = Prescription.objects.filter(
-            prescribed_date__range=[start_date, end_date],
-            prescriber=request.user
-        )
+        if request.GET.get('scope') == 'clinic':
+            return _json_response(cached_rollup_json('safety-scores', _safety_scores_from_rollups, start_date, end_date, days))
         
-        safety_scores = []
-        safety_by_category = {}
+        # Every medication scored in SQL; the statistics are aggregates over that score
+        medications = PrescriptionMedication.objects.filter(
+            prescription__prescribed_date__range=[start_date, end_date],
+            prescription__prescriber=request.user
+        ).annotate(safety_score=safety_score_expression(end_date))
+        
+        score_stats = medications.aggregate(
+            total=Count('id'),
+            average=Avg('safety_score'),
+            high=Count('id', filter=Q(safety_score__gte=0.8)),
+            medium=Count('id', filter=Q(safety_score__gte=0.6, safety_score__lt=0.8)),
+            low=Count('id', filter=Q(safety_score__lt=0.6)),
+            contraindicated=Count('id', filter=Q(safety_score=0)),
+        )
         
-        for prescription in prescriptions:
-            patient = prescription.patient
-            patient_allergies = set(patient.allergies.values_list('id', flat=True))
-            
-            for med in prescription.prescription_medications.all():
-                drug = med.drug
-                safety_score = 1.0
-                
-                # Check allergy conflicts
-                if drug.allergy_conflicts.filter(id__in=patient_allergies).exists():
-                    safety_score = 0.0
-                
-                # Check contraindications
-                if drug.contraindications:
-                    safety_score *= 0.9
-                
-                # Check pregnancy/breastfeeding
-                if patient.pregnancy_status and drug.pregnancy_category in ['D', 'X']:
-                    safety_score = 0.0
-                elif patient.breastfeeding and not drug.breastfeeding_safe:
-                    safety_score *= 0.8
-                
-                # Check age-specific issues
-                if patient.age < 12 and not drug.pediatric_dose_mg_kg:
-                    safety_score *= 0.9
-                elif patient.age > 65:
-                    safety_score *= 0.95
-                
-                # Check organ function
-                if patient.kidney_function and 'impairment' in patient.kidney_function.lower():
-                    safety_score *= 0.9
-                if patient.liver_function and 'impairment' in patient.liver_function.lower():
-                    safety_score *= 0.9
-                
-                safety_scores.append(safety_score)
-                
-                # Category breakdown
-                category = drug.category
-                if category not in safety_by_category:
-                    safety_by_category[category] = []
-                safety_by_category[category].append(safety_score)
-        
-        if not safety_scores:
-            return Response({
+        if not score_stats['total']:
+            return _json_response({
                 'message': 'No prescriptions found in the specified date range'
             })
         
         # Calculate statistics
-        avg_safety_score = sum(safety_scores) / len(safety_scores)
-        high_safety = len([s for s in safety_scores if s >= 0.8])
-        medium_safety = len([s for s in safety_scores if 0.6 <= s < 0.8])
-        low_safety = len([s for s in safety_scores if s < 0.6])
-        contraindicated = len([s for s in safety_scores if s == 0])
+        avg_safety_score = score_stats['average']
+        high_safety = score_stats['high']
+        medium_safety = score_stats['medium']
+        low_safety = score_stats['low']
+        contraindicated = score_stats['contraindicated']
         
         # Category averages
-        category_averages = {}
-        for category, scores in safety_by_category.items():
-            category_averages[category] = round(sum(scores) / len(scores), 3)
+        category_averages = {
+            category: round(average, 3)
+            for category, average in medications.values_list('drug__category').annotate(
+                average=Avg('safety_score')
+            ).order_by()
+        }
         
         # Top safety issues
         top_issues = []
@@ -272,7 +491,7 @@ def safety_score_analytics(request):
         if low_safety > 0:
             top_issues.append(f"{low_safety} low safety prescriptions")
         
-        return Response({
+        return _json_response({
             'date_range': {
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
@@ -284,7 +503,7 @@ def safety_score_analytics(request):
                 'medium_safety_prescriptions': medium_safety,
                 'low_safety_prescriptions': low_safety,
                 'contraindicated_prescriptions': contraindicated,
-                'total_prescriptions_analyzed': len(safety_scores)
+                'total_prescriptions_analyzed': score_stats['total']
             },
             'safety_by_category': category_averages,
             'top_safety_issues': top_issues
@@ -298,6 +517,7 @@ def safety_score_analytics(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('usage-statistics')
 def usage_statistics(request):
     """Get detailed medication usage statistics"""
     try:
@@ -306,6 +526,9 @@ def usage_statistics(request):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
+        if request.GET.get('scope') == 'clinic':
+            return _json_response(cached_rollup_json('usage-statistics', _usage_statistics_from_rollups, start_date, end_date, days))
+        
         # Get all medications prescribed in date range
         prescription_meds = PrescriptionMedication.objects.filter(
             prescription__prescribed_date__range=[start_date, end_date],
@@ -313,14 +536,45 @@ def usage_statistics(request):
         )
         
         drug_stats = {}
+        interaction_pairs = interacting_pairs()
+        
+        # (medication id, drug id) of every medication on each prescription, for the interaction checks
+        prescription_drugs = defaultdict(list)
+        for prescription_id, med_id, drug_id in prescription_meds.values_list('prescription_id', 'id', 'drug_id'):
+            prescription_drugs[prescription_id].append((med_id, drug_id))
+        
+        # Allergy ids of every patient in the window, loaded once instead of per medication
+        patient_allergy_ids = defaultdict(set)
+        for patient_id, allergy_id in PatientAllergy.objects.filter(
+            patient__prescriptions__in=prescription_meds.values('prescription_id')
+        ).values_list('patient_id', 'allergy_id').distinct():
+            patient_allergy_ids[patient_id].add(allergy_id)
+        
+        # Allergy ids each drug conflicts with, shared across requests
+        drug_allergy_ids = drug_allergy_conflicts()
+        
+        # Average adherence per medication, one grouped query
+        adherence_by_medication = dict(
+            MedicationAdherence.objects.filter(
+                prescription_medication__in=prescription_meds
+            ).values_list('prescription_medication_id').annotate(avg=Avg('taken')).order_by()
+        )
         
-        for med in prescription_meds:
-            drug = med.drug
-            if drug.name not in drug_stats:
-                drug_stats[drug.name] = {
-                    'drug_id': drug.id,
-                    'category': drug.category,
-                    'therapeutic_class': drug.therapeutic_class,
+        today = date.today()
+        for (
+            med_id, prescription_id, quantity, dosage, duration,
+            drug_id, drug_name, category, therapeutic_class, contraindications,
+            patient_id, date_of_birth,
+        ) in prescription_meds.values_list(
+            'id', 'prescription_id', 'quantity', 'dosage', 'duration',
+            'drug_id', 'drug__name', 'drug__category', 'drug__therapeutic_class', 'drug__contraindications',
+            'prescription__patient_id', 'prescription__patient__date_of_birth',
+        ).iterator(chunk_size=CHUNK_SIZE):
+            if drug_name not in drug_stats:
+                drug_stats[drug_name] = {
+                    'drug_id': drug_id,
+                    'category': category,
+                    'therapeutic_class': therapeutic_class,
                     'prescriptions_count': 0,
                     'total_quantity': 0,
                     'total_dosages': [],
@@ -334,64 +588,50 @@ def usage_statistics(request):
                     'adherence_scores': []
                 }
             
-            stats = drug_stats[drug.name]
+            stats = drug_stats[drug_name]
             stats['prescriptions_count'] += 1
-            stats['total_quantity'] += med.quantity
+            stats['total_quantity'] += quantity
             
             # Dosage analysis
-            try:
-                dosage = float(med.dosage.replace('mg', '').replace('mcg', ''))
+            dosage = parse_dosage(dosage)
+            if dosage is not None:
                 stats['total_dosages'].append(dosage)
-            except:
-                pass
             
             # Duration analysis
-            try:
-                duration = med.duration.lower()
-                if 'day' in duration:
-                    days_match = duration.split('day')[0].strip()
-                    if days_match.isdigit():
-                        stats['durations'].append(int(days_match))
-            except:
-                pass
+            duration_days = parse_duration_days(duration)
+            if duration_days is not None:
+                stats['durations'].append(duration_days)
             
             # Age group analysis
-            patient = med.prescription.patient
-            if patient.age < 18:
+            patient_age = age_on(date_of_birth, today)
+            if patient_age < 18:
                 stats['pediatric_usage'] += 1
-            elif patient.age < 65:
+            elif patient_age < 65:
                 stats['adult_usage'] += 1
             else:
                 stats['geriatric_usage'] += 1
             
             # Safety analysis
-            patient_allergies = set(patient.allergies.values_list('id', flat=True))
-            if drug.allergy_conflicts.filter(id__in=patient_allergies).exists():
+            has_allergy_conflict = not drug_allergy_ids.get(drug_id, frozenset()).isdisjoint(patient_allergy_ids[patient_id])
+            if has_allergy_conflict:
                 stats['allergy_conflicts'] += 1
             
             # Check interactions with other meds in same prescription
-            other_meds = med.prescription.prescription_medications.exclude(id=med.id)
-            for other_med in other_meds:
-                if DrugInteraction.objects.filter(
-                    Q(drug1=drug, drug2=other_med.drug) | Q(drug1=other_med.drug, drug2=drug)
-                ).exists():
+            for other_med_id, other_drug_id in prescription_drugs[prescription_id]:
+                if other_med_id != med_id and (min(drug_id, other_drug_id), max(drug_id, other_drug_id)) in interaction_pairs:
                     stats['interaction_warnings'] += 1
             
             # Calculate safety score
             safety_score = 1.0
-            if drug.allergy_conflicts.filter(id__in=patient_allergies).exists():
+            if has_allergy_conflict:
                 safety_score = 0.0
-            elif drug.contraindications:
+            elif contraindications:
                 safety_score *= 0.9
             stats['safety_scores'].append(safety_score)
             
             # Adherence analysis
-            adherence_records = MedicationAdherence.objects.filter(
-                prescription_medication=med
-            )
-            if adherence_records.exists():
-                avg_adherence = adherence_records.aggregate(avg=Avg('taken'))['avg'] or 0
-                stats['adherence_scores'].append(avg_adherence)
+            if med_id in adherence_by_medication:
+                stats['adherence_scores'].append(adherence_by_medication[med_id] or 0)
         
         # Calculate averages and summaries
         for drug_name, stats in drug_stats.items():
@@ -428,7 +668,8 @@ def usage_statistics(request):
         # Sort by prescription count
         sorted_stats = sorted(drug_stats.items(), key=lambda x: x[1]['prescriptions_count'], reverse=True)
         
-        return Response({
+        # One entry per drug; written out as it is encoded rather than as a single body
+        return _streaming_json_response({
             'date_range': {
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
@@ -439,8 +680,8 @@ def usage_statistics(request):
                 'total_prescriptions': sum(stats['prescriptions_count'] for stats in drug_stats.values()),
                 'most_prescribed_drug': sorted_stats[0][0] if sorted_stats else None
             },
-            'usage_statistics': dict(sorted_stats)
-        })
+            'usage_statistics': sorted_stats
+        }, 'usage_statistics')
         
     except Exception as e:
         return Response({
@@ -450,6 +691,7 @@ def usage_statistics(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_dashboard('drug-interactions')
 def drug_interaction_analytics(request):
     """Analyze drug interaction patterns"""
     try:
@@ -458,68 +700,71 @@ def drug_interaction_analytics(request):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        prescriptions = Prescription.objects.filter(
-            prescribed_date__range=[start_date, end_date],
-            prescriber=request.user
+        medications = PrescriptionMedication.objects.filter(
+            prescription__prescribed_date__range=[start_date, end_date],
+            prescription__prescriber=request.user
         )
         
         interaction_patterns = {}
-        
-        for prescription in prescriptions:
-            meds = list(prescription.prescription_medications.all())
+        interaction_pairs = interacting_pairs()
+        today = date.today()
+        
+        for meds in _medications_by_prescription(
+            medications, 'prescription__patient_id', 'prescription__patient__date_of_birth', 'drug_id', 'drug__name'
+        ):
+            patient_id, date_of_birth = meds[0][:2]
+            patient_age = age_on(date_of_birth, today)
+            drugs = [med[2:] for med in meds]
             
             # Check all pairs of medications
-            for i in range(len(meds)):
-                for j in range(i + 1, len(meds)):
-                    drug1, drug2 = meds[i].drug, meds[j].drug
+            for i in range(len(drugs)):
+                for j in range(i + 1, len(drugs)):
+                    (drug1_id, drug1_name), (drug2_id, drug2_name) = drugs[i], drugs[j]
                     
                     # Ensure consistent ordering
-                    if drug1.id > drug2.id:
-                        drug1, drug2 = drug2, drug1
+                    if drug1_id > drug2_id:
+                        (drug1_id, drug1_name), (drug2_id, drug2_name) = drugs[j], drugs[i]
                     
-                    key = f"{drug1.name} + {drug2.name}"
+                    key = f"{drug1_name} + {drug2_name}"
                     
                     if key not in interaction_patterns:
                         interaction_patterns[key] = {
-                            'drug1_id': drug1.id,
-                            'drug1_name': drug1.name,
-                            'drug2_id': drug2.id,
-                            'drug2_name': drug2.name,
+                            'drug1_id': drug1_id,
+                            'drug1_name': drug1_name,
+                            'drug2_id': drug2_id,
+                            'drug2_name': drug2_name,
                             'co_prescription_count': 0,
                             'interaction_warnings_count': 0,
-                            'severity_distribution': {'minor': 0, 'moderate': 0, 'major': 0, 'contraindicated': 0},
+                            'severity_distribution': {severity: 0 for severity, _ in Interaction.SEVERITY_CHOICES},
                             'affected_patients': set(),
-                            'patient_ages': [],
+                            'patient_age_sum': 0,
                             'dose_adjustments': 0,
                             'therapy_changes': 0
                         }
                     
                     pattern = interaction_patterns[key]
                     pattern['co_prescription_count'] += 1
-                    pattern['affected_patients'].add(prescription.patient.id)
-                    pattern['patient_ages'].append(prescription.patient.age)
+                    pattern['affected_patients'].add(patient_id)
+                    pattern['patient_age_sum'] += patient_age
                     
-                    # Check for interactions
-                    interactions = DrugInteraction.objects.filter(
-                        Q(drug1=drug1, drug2=drug2) | Q(drug1=drug2, drug2=drug1)
-                    )
-                    
-                    if interactions.exists():
+                    # Check for interactions; severities are tallied per pair once the loop is done
+                    if (drug1_id, drug2_id) in interaction_pairs:
                         pattern['interaction_warnings_count'] += 1
-                        for interaction in interactions:
-                            pattern['severity_distribution'][interaction.severity] += 1
         
-        # Convert sets to counts and calculate averages
+        # Convert sets to counts and running sums to averages (one age is added per co-prescription)
         for key, pattern in interaction_patterns.items():
-            pattern['affected_patients_count'] = len(pattern['affected_patients'])
-            pattern['average_patient_age'] = round(sum(pattern['patient_ages']) / len(pattern['patient_ages']), 1)
-            del pattern['affected_patients']
-            del pattern['patient_ages']
+            # Every warning on a pair counts each of its interactions' severities once
+            if pattern['interaction_warnings_count']:
+                severities = Counter(interaction_pairs[pattern['drug1_id'], pattern['drug2_id']])
+                for severity, count in severities.items():
+                    pattern['severity_distribution'][severity] += count * pattern['interaction_warnings_count']
+            pattern['affected_patients_count'] = len(pattern.pop('affected_patients'))
+            pattern['average_patient_age'] = round(pattern.pop('patient_age_sum') / pattern['co_prescription_count'], 1)
         
         # Sort by co-prescription count
         sorted_patterns = sorted(interaction_patterns.items(), key=lambda x: x[1]['co_prescription_count'], reverse=True)
         
-        return Response({
+        return _json_response({
             'date_range': {
                 'start_date': start_date.strftime('%Y-%m-%d'),
                 'end_date': end_date.strftime('%Y-%m-%d'),
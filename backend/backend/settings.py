@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'patients',
     'drugs',
     'rx',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -87,13 +88,48 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 import dj_database_url
 from decouple import config
 
+# Connections are persistent (reused across requests for CONN_MAX_AGE seconds) and
+# health-checked before reuse, so request handlers don't pay a connect + auth per request
 DATABASES = {
     'default': dj_database_url.config(
         default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR / "db.sqlite3"}'),
-        conn_max_age=600,
+        conn_max_age=config('CONN_MAX_AGE', default=600, cast=int),
         conn_health_checks=True,
     )
 }
+# .iterator() streams through server-side cursors on PostgreSQL; disable them
+# when running behind a transaction-pooling PgBouncer
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = config('DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool)
+
+# Cache (Redis when REDIS_URL is set, otherwise per-process memory)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Directory of an int8 ONNX export of all-MiniLM-L6-v2 (model_int8.onnx plus its tokenizer files).
+# When set and onnxruntime is installed, AI suggestions encode with it instead of SentenceTransformer:
+#   optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 DIR
+#   python -c "from onnxruntime.quantization import quantize_dynamic, QuantType; \
+#              quantize_dynamic('DIR/model.onnx', 'DIR/model_int8.onnx', weight_type=QuantType.QInt8)"
+SENTENCE_MODEL_ONNX_DIR = config('SENTENCE_MODEL_ONNX_DIR', default='')
+
+# Drug embeddings are saved here so new worker processes memory-map them instead of re-encoding the catalog
+AI_CACHE_DIR = config('AI_CACHE_DIR', default=str(BASE_DIR / 'ai_cache'))
+
+# Covering indexes (Index.include) only take effect on PostgreSQL; SQLite
+# builds them as plain indexes, which is fine for local development.
+SILENCED_SYSTEM_CHECKS = ['models.W040']
 
 
 # Password validation
@@ -1,5 +1,12 @@
-import sqlite3
 import os
+import re
+import sqlite3
+
+# Directories that never hold project data but can contain thousands of files
+SKIP_DIRS = {'node_modules', '.git', '.venv', 'venv', '__pycache__'}
+# '*.csv' files whose name mentions 'med' or 'drug' in any case
+MEDICINAL_CSV_RE = re.compile(r'(?i:.*(?:med|drug)).*\.csv\Z')
+
 
 def check_medicinal_data():
     """Check if medicinal data exists in the database"""
@@ -16,73 +23,66 @@ def check_medicinal_data():
     cursor = conn.cursor()
     
     try:
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        # Get all tables, flagging drug/allergy tables in SQL (LIKE is case-insensitive for ASCII)
+        cursor.execute(
+            "SELECT name, name LIKE '%drug%', name LIKE '%allerg%' FROM sqlite_master WHERE type='table'"
+        )
         tables = cursor.fetchall()
         
         print(f"\n[INFO] Tables in database ({len(tables)} total):")
         for table in tables:
             print(f"  - {table[0]}")
         
+        drugs_table = next((name for name, is_drug, _ in tables if is_drug), None)
+        allergies_table = next((name for name, _, is_allergy in tables if is_allergy), None)
+        
+        # Count both tables in one round trip
+        count_queries = [
+            f"SELECT '{label}', COUNT(*) FROM \"{table}\""
+            for label, table in (('drugs', drugs_table), ('allergies', allergies_table))
+            if table
+        ]
+        counts = {}
+        if count_queries:
+            cursor.execute(" UNION ALL ".join(count_queries))
+            counts = dict(cursor.fetchall())
+        
         # Check drugs table specifically
-        if any('drug' in table[0].lower() for table in tables):
+        if drugs_table:
             print(f"\n[DRUGS] Checking drugs table...")
             
-            # Find drugs table
-            drugs_table = None
-            for table in tables:
-                if 'drug' in table[0].lower():
-                    drugs_table = table[0]
-                    break
+            drug_count = counts['drugs']
+            print(f"  [COUNT] Total drugs in database: {drug_count}")
             
-            if drugs_table:
-                # Count drugs
-                cursor.execute(f"SELECT COUNT(*) FROM {drugs_table}")
-                drug_count = cursor.fetchone()[0]
-                print(f"  [COUNT] Total drugs in database: {drug_count}")
+            if drug_count > 0:
+                # Get sample drugs
+                cursor.execute(f"SELECT id, name, therapeutic_class FROM {drugs_table} LIMIT 5")
+                sample_drugs = cursor.fetchall()
                 
-                if drug_count > 0:
-                    # Get sample drugs
-                    cursor.execute(f"SELECT id, name, therapeutic_class FROM {drugs_table} LIMIT 5")
-                    sample_drugs = cursor.fetchall()
-                    
-                    print(f"  [SAMPLE] Sample drugs:")
-                    for drug in sample_drugs:
-                        print(f"    - ID: {drug[0]}, Name: {drug[1]}, Class: {drug[2] or 'N/A'}")
-                else:
-                    print("  [WARNING] No drugs found in database!")
+                print(f"  [SAMPLE] Sample drugs:")
+                for drug in sample_drugs:
+                    print(f"    - ID: {drug[0]}, Name: {drug[1]}, Class: {drug[2] or 'N/A'}")
             else:
-                print("  [ERROR] No drugs table found!")
+                print("  [WARNING] No drugs found in database!")
         else:
             print("\n[ERROR] No drugs table found in database!")
         
         # Check allergies table
-        if any('allerg' in table[0].lower() for table in tables):
+        if allergies_table:
             print(f"\n[ALLERGIES] Checking allergies table...")
             
-            # Find allergies table
-            allergies_table = None
-            for table in tables:
-                if 'allerg' in table[0].lower():
-                    allergies_table = table[0]
-                    break
+            allergy_count = counts['allergies']
+            print(f"  [COUNT] Total allergies in database: {allergy_count}")
             
-            if allergies_table:
-                cursor.execute(f"SELECT COUNT(*) FROM {allergies_table}")
-                allergy_count = cursor.fetchone()[0]
-                print(f"  [COUNT] Total allergies in database: {allergy_count}")
+            if allergy_count > 0:
+                cursor.execute(f"SELECT id, name FROM {allergies_table} LIMIT 5")
+                sample_allergies = cursor.fetchall()
                 
-                if allergy_count > 0:
-                    cursor.execute(f"SELECT id, name FROM {allergies_table} LIMIT 5")
-                    sample_allergies = cursor.fetchall()
-                    
-                    print(f"  [SAMPLE] Sample allergies:")
-                    for allergy in sample_allergies:
-                        print(f"    - ID: {allergy[0]}, Name: {allergy[1]}")
-                else:
-                    print("  [WARNING] No allergies found in database!")
+                print(f"  [SAMPLE] Sample allergies:")
+                for allergy in sample_allergies:
+                    print(f"    - ID: {allergy[0]}, Name: {allergy[1]}")
             else:
-                print("  [ERROR] No allergies table found!")
+                print("  [WARNING] No allergies found in database!")
         
         # Check if there are any CSV files with medicinal data
         print(f"\n[FILES] Checking for medicinal data files...")
@@ -90,9 +90,9 @@ def check_medicinal_data():
         # Check for CSV files in the project
         csv_files = []
         for root, dirs, files in os.walk('..'):
-            for file in files:
-                if file.endswith('.csv') and ('med' in file.lower() or 'drug' in file.lower()):
-                    csv_files.append(os.path.join(root, file))
+            # Prune in place so os.walk never descends into dependency/VCS trees
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            csv_files.extend(os.path.join(root, file) for file in files if MEDICINAL_CSV_RE.match(file))
         
         if csv_files:
             print(f"  [FOUND] Found {len(csv_files)} medicinal CSV files:")
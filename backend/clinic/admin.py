@@ -1,7 +1,52 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models import Appointment, Queue, ClinicSettings
 
 
+class EstimatedCountPaginator(Paginator):
+    """Paginator that takes PostgreSQL's planner row estimate for an unfiltered changelist
+    instead of a COUNT(*) over the whole table; small tables and filtered lists still count exactly"""
+    ESTIMATE_THRESHOLD = 10000
+    
+    @cached_property
+    def count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor == 'postgresql' and not self.object_list.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [self.object_list.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table is first analyzed
+            if row and row[0] >= self.ESTIMATE_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class DoctorListFilter(admin.SimpleListFilter):
+    """Filter by doctor, offering only doctors who have rows in the admin's table
+    (the default FK filter lists every user)"""
+    title = 'doctor'
+    parameter_name = 'doctor'
+    
+    def lookups(self, request, model_admin):
+        doctors = model_admin.model.objects.order_by('doctor__first_name', 'doctor__last_name').values_list(
+            'doctor_id', 'doctor__first_name', 'doctor__last_name', 'doctor__username'
+        ).distinct()
+        return [
+            (doctor_id, f"{first_name} {last_name}".strip() or username)
+            for doctor_id, first_name, last_name, username in doctors
+        ]
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(doctor_id=self.value())
+        return queryset
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = [
@@ -10,14 +55,18 @@ class AppointmentAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         'appointment_type', 'status', 'priority', 'scheduled_time',
-        'created_at', 'doctor'
-    ]
-    search_fields = [
-        'patient__first_name', 'patient__last_name', 'doctor__first_name',
-        'doctor__last_name', 'reason', 'diagnosis'
+        'created_at', DoctorListFilter
     ]
+    # Each field is a wildcard ILIKE; these are the trigram-indexed ones (doctors are in the list filter)
+    search_fields = ['patient__last_name', 'patient__first_name', 'reason']
     ordering = ['-scheduled_time']
     readonly_fields = ['created_at', 'updated_at']
+    # Filtered lists show "N results" without a second COUNT(*) over the whole table
+    show_full_result_count = False
+    list_per_page = 50
+    paginator = EstimatedCountPaginator
+    # Patients and users have no admin to autocomplete against; plain id inputs avoid rendering every row
+    raw_id_fields = ('patient', 'doctor', 'created_by')
     
     fieldsets = (
         ('Basic Information', {
@@ -37,6 +86,10 @@ class AppointmentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_queryset(self, request):
+        # The patient and doctor columns render the related rows; joining them here avoids a query per row
+        return super().get_queryset(request).select_related('patient', 'doctor', 'created_by')
 
 
 @admin.register(Queue)
@@ -45,13 +98,15 @@ class QueueAdmin(admin.ModelAdmin):
         'id', 'appointment', 'doctor', 'position', 'estimated_wait_time',
         'called_at', 'created_at'
     ]
-    list_filter = ['doctor', 'created_at', 'called_at']
-    search_fields = [
-        'appointment__patient__first_name', 'appointment__patient__last_name',
-        'doctor__first_name', 'doctor__last_name'
-    ]
+    list_filter = [DoctorListFilter, 'created_at', 'called_at']
+    search_fields = ['appointment__patient__last_name', 'appointment__patient__first_name']
     ordering = ['doctor', 'position']
     readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ('appointment', 'doctor')
+    
+    def get_queryset(self, request):
+        # Queue.__str__ and the appointment column both read the appointment's patient_full_name
+        return super().get_queryset(request).select_related('appointment', 'doctor')
 
 
 @admin.register(ClinicSettings)
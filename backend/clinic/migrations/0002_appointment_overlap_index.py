@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0001_initial'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'status', 'scheduled_time'], name='appt_doc_status_time_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-15 07:05
+
+from django.db import migrations
+
+
+# Admin and API search run `UPPER(col::text) LIKE UPPER('%q%')`, which no btree index can serve.
+# pg_trgm GIN indexes on the same expression make the wildcard match index-backed. They are
+# PostgreSQL-only, so they are created here rather than in Meta.indexes.
+TRIGRAM_INDEXES = [
+    ('patients', 'Patient', 'first_name', 'patient_first_name_trgm'),
+    ('patients', 'Patient', 'last_name', 'patient_last_name_trgm'),
+    ('clinic', 'Appointment', 'reason', 'appt_reason_trgm'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for app_label, model_name, column, index_name in TRIGRAM_INDEXES:
+        table = apps.get_model(app_label, model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, _, _, index_name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0002_appointment_overlap_index'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
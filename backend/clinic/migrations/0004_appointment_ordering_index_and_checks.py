@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0003_trigram_search_indexes'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['priority', 'scheduled_time'], name='appt_prio_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.CheckConstraint(condition=models.Q(('priority__gte', 1), ('priority__lte', 4)), name='appt_priority_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.CheckConstraint(condition=models.Q(('estimated_duration__gt', 0)), name='appt_duration_pos'),
+        ),
+    ]
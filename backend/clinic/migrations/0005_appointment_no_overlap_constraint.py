@@ -0,0 +1,71 @@
+# Generated by Django 5.1.6 on 2026-10-15 07:20
+
+from django.db import migrations
+
+
+# A doctor's active appointments may not overlap. Exclusion constraints are PostgreSQL-only, so
+# this is created here rather than in Meta.constraints; AppointmentSerializer.validate keeps the
+# equivalent query-based check for other databases.
+#
+# timestamptz + interval is only STABLE, which an index expression cannot use; adding whole minutes
+# does not depend on the session time zone, so the slot function is safe to declare IMMUTABLE.
+# An appointment that has finished occupies its slot up to actual_end_time.
+CREATE_SLOT_FUNCTION = """
+CREATE OR REPLACE FUNCTION clinic_appointment_slot(start timestamptz, minutes integer, actual_end timestamptz)
+RETURNS tstzrange LANGUAGE sql IMMUTABLE AS $$
+    SELECT tstzrange(start, GREATEST(start, COALESCE(actual_end, start + make_interval(mins => minutes))))
+$$
+"""
+
+# The constraint cannot be added while existing rows violate it; these pairs have to be
+# rescheduled or cancelled first
+OVERLAPPING_APPOINTMENTS = """
+SELECT a.id, b.id FROM clinic_appointment a
+JOIN clinic_appointment b ON b.doctor_id = a.doctor_id AND b.id > a.id
+WHERE a.status IN ('scheduled', 'waiting', 'in_progress')
+  AND b.status IN ('scheduled', 'waiting', 'in_progress')
+  AND clinic_appointment_slot(a.scheduled_time, a.estimated_duration, a.actual_end_time)
+   && clinic_appointment_slot(b.scheduled_time, b.estimated_duration, b.actual_end_time)
+ORDER BY a.id, b.id
+"""
+
+ADD_CONSTRAINT = """
+ALTER TABLE clinic_appointment ADD CONSTRAINT appt_no_overlap EXCLUDE USING gist (
+    doctor_id WITH =,
+    clinic_appointment_slot(scheduled_time, estimated_duration, actual_end_time) WITH &&
+) WHERE (status IN ('scheduled', 'waiting', 'in_progress'))
+"""
+
+
+def create_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(CREATE_SLOT_FUNCTION)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPPING_APPOINTMENTS)
+        overlapping = cursor.fetchall()
+    if overlapping:
+        raise RuntimeError(
+            'Cannot add appt_no_overlap: these active appointments overlap for the same doctor '
+            '(appointment id pairs): ' + ', '.join(f'{a}/{b}' for a, b in overlapping)
+        )
+    schema_editor.execute(ADD_CONSTRAINT)
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE clinic_appointment DROP CONSTRAINT IF EXISTS appt_no_overlap')
+    schema_editor.execute('DROP FUNCTION IF EXISTS clinic_appointment_slot(timestamptz, integer, timestamptz)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0004_appointment_ordering_index_and_checks'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_overlap_constraint, drop_overlap_constraint),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Concat, Trim
+
+
+def copy_full_names(apps, schema_editor):
+    Appointment = apps.get_model('clinic', 'Appointment')
+    Patient = apps.get_model('patients', 'Patient')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    # Patient.full_name and User.get_full_name() respectively
+    patient_names = Patient.objects.filter(pk=OuterRef('patient_id')).values(
+        name=Concat('first_name', Value(' '), 'last_name')
+    )
+    doctor_names = User.objects.filter(pk=OuterRef('doctor_id')).values(
+        name=Trim(Concat('first_name', Value(' '), 'last_name'))
+    )
+    Appointment.objects.update(
+        patient_full_name=Subquery(patient_names[:1]),
+        doctor_full_name=Subquery(doctor_names[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0005_appointment_no_overlap_constraint'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='doctor_full_name',
+            field=models.CharField(default='', editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='patient_full_name',
+            field=models.CharField(default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(copy_full_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0006_appointment_full_names'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='is_emergency',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('appointment_type', 'emergency'), ('priority', 1), _connector='OR'), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['is_emergency', 'scheduled_time'], name='appt_emergency_time_idx'),
+        ),
+    ]
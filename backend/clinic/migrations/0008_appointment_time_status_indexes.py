@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0007_appointment_is_emergency'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='clinic_appo_schedul_ff804a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['scheduled_time', 'status'], name='appt_time_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['scheduled_time', 'priority'], name='appt_time_prio_idx'),
+        ),
+    ]
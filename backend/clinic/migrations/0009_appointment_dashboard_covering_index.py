@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-15 07:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic', '0008_appointment_time_status_indexes'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['scheduled_time'], include=('status', 'priority', 'doctor', 'doctor_full_name'), name='appt_day_stats_idx'),
+        ),
+    ]
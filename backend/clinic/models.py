@@ -1,10 +1,39 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Case, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.conf import settings
 from patients.models import Patient
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 
+class AppointmentQuerySet(models.QuerySet):
+    def with_estimated_wait_time(self):
+        """Annotate estimated_wait_time in minutes: for a waiting appointment, the summed estimated
+        durations of its doctor's waiting appointments up to and including it in queue order; 0 otherwise.
+        A correlated subquery rather than a window, so it stays correct when the list is filtered."""
+        queued_through = self.model.objects.filter(
+            doctor=OuterRef('doctor'),
+            status='waiting',
+            queue_position__lte=OuterRef('queue_position')
+        ).order_by().values('doctor').annotate(total=Sum('estimated_duration')).values('total')
+        return self.annotate(estimated_wait_time=Case(
+            When(status='waiting', then=Coalesce(Subquery(queued_through), 0)),
+            default=Value(0),
+        ))
+
+
+class QueueQuerySet(models.QuerySet):
+    def active_for_doctor(self, doctor_id):
+        """The doctor's waiting and in-progress queue entries in position order"""
+        return self.filter(
+            doctor_id=doctor_id, appointment__status__in=['waiting', 'in_progress']
+        ).order_by('position')
+
+
 class Appointment(models.Model):
     """Model for managing clinic appointments"""
     
@@ -31,9 +60,33 @@ class Appointment(models.Model):
         (4, 'Low Priority'),
     ]
     
+    # PostgreSQL exclusion constraint keeping a doctor's active appointments from overlapping (migration 0005)
+    NO_OVERLAP_CONSTRAINT = 'appt_no_overlap'
+    
+    # Statuses an appointment cannot leave
+    TERMINAL_STATUSES = frozenset({'completed', 'cancelled', 'no_show'})
+    
+    STATUS_COLORS = {
+        'scheduled': 'blue',
+        'waiting': 'orange',
+        'in_progress': 'green',
+        'completed': 'gray',
+        'cancelled': 'red',
+        'no_show': 'red',
+    }
+    PRIORITY_COLORS = {
+        1: 'red',    # Emergency
+        2: 'orange', # High Priority
+        3: 'blue',   # Normal
+        4: 'gray',   # Low Priority
+    }
+    
     # Basic Information
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointments')
     doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='appointments')
+    # Copies of the patient's and doctor's names, kept in sync by the receivers below so lists skip both joins
+    patient_full_name = models.CharField(max_length=201, editable=False, default='')
+    doctor_full_name = models.CharField(max_length=301, editable=False, default='')
     
     # Appointment Details
     appointment_type = models.CharField(max_length=20, choices=APPOINTMENT_TYPES, default='normal')
@@ -51,6 +104,12 @@ class Appointment(models.Model):
     
     # Queue Management
     queue_position = models.IntegerField(default=0, help_text="Position in doctor's queue")
+    # Computed by the database, so emergencies can be filtered and ordered on in SQL
+    is_emergency = models.GeneratedField(
+        expression=Q(appointment_type='emergency') | Q(priority=1),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
     actual_start_time = models.DateTimeField(blank=True, null=True)
     actual_end_time = models.DateTimeField(blank=True, null=True)
     
@@ -59,55 +118,72 @@ class Appointment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_appointments')
     
+    objects = AppointmentQuerySet.as_manager()
+    
+    # Compared with their loaded values by the save signals, which skip their queries when these are unchanged
+    TRACKED_FIELDS = ('patient_id', 'doctor_id', 'appointment_type', 'priority')
+    
     class Meta:
         ordering = ['priority', 'scheduled_time']
         indexes = [
             models.Index(fields=['doctor', 'status']),
-            models.Index(fields=['scheduled_time']),
             models.Index(fields=['priority', 'status']),
+            # Day-range filters (the dashboard) that also test status or priority; these lead with
+            # scheduled_time, so they also serve range scans on scheduled_time alone
+            models.Index(fields=['scheduled_time', 'status'], name='appt_time_status_idx'),
+            models.Index(fields=['scheduled_time', 'priority'], name='appt_time_prio_idx'),
+            # Overlap check in AppointmentSerializer.validate: one doctor's active appointments by start time
+            models.Index(fields=['doctor', 'status', 'scheduled_time'], name='appt_doc_status_time_idx'),
+            # Matches Meta.ordering, so unfiltered lists are read in index order instead of sorted
+            models.Index(fields=['priority', 'scheduled_time'], name='appt_prio_time_idx'),
+            models.Index(fields=['is_emergency', 'scheduled_time'], name='appt_emergency_time_idx'),
+            # Covers DASHBOARD_STATS_SQL, so PostgreSQL answers it with an index-only scan over one day;
+            # other databases ignore include (models.W040, silenced in settings) and get a plain index
+            models.Index(
+                fields=['scheduled_time'],
+                include=['status', 'priority', 'doctor', 'doctor_full_name'],
+                name='appt_day_stats_idx',
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=Q(priority__gte=1, priority__lte=4), name='appt_priority_range'),
+            models.CheckConstraint(condition=Q(estimated_duration__gt=0), name='appt_duration_pos'),
         ]
     
-    def __str__(self):
-        return f"{self.patient.get_full_name()} - {self.get_appointment_type_display()} ({self.scheduled_time.strftime('%Y-%m-%d %H:%M')})"
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.track_loaded_values()
+        return instance
     
-    @property
-    def is_emergency(self):
-        return self.appointment_type == 'emergency' or self.priority == 1
+    def track_loaded_values(self):
+        """Remember the tracked fields as they are in the database (deferred fields are left out)"""
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+    
+    def has_changed(self, name):
+        """Whether a tracked field differs from its loaded value; always true for unsaved instances"""
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None:
+            return True
+        if name not in self.__dict__:
+            return False  # Deferred and never assigned
+        return name not in loaded_values or loaded_values[name] != self.__dict__[name]
+    
+    def __str__(self):
+        return f"{self.patient_full_name} - {self.get_appointment_type_display()} ({self.scheduled_time.strftime('%Y-%m-%d %H:%M')})"
     
     @property
     def is_waiting(self):
         return self.status in ['waiting', 'in_progress']
     
-    @property
-    def estimated_wait_time(self):
-        """Calculate estimated wait time based on queue position and average consultation time"""
-        if self.status != 'waiting':
-            return 0
-        
-        # Simple calculation: position * average consultation time
-        return self.queue_position * 20  # 20 minutes average per patient
     
     def get_status_display_color(self):
         """Get color for status display"""
-        colors = {
-            'scheduled': 'blue',
-            'waiting': 'orange',
-            'in_progress': 'green',
-            'completed': 'gray',
-            'cancelled': 'red',
-            'no_show': 'red',
-        }
-        return colors.get(self.status, 'gray')
+        return self.STATUS_COLORS.get(self.status, 'gray')
     
     def get_priority_display_color(self):
         """Get color for priority display"""
-        colors = {
-            1: 'red',    # Emergency
-            2: 'orange', # High Priority
-            3: 'blue',   # Normal
-            4: 'gray',   # Low Priority
-        }
-        return colors.get(self.priority, 'gray')
+        return self.PRIORITY_COLORS.get(self.priority, 'gray')
 
 
 class Queue(models.Model):
@@ -125,33 +201,62 @@ class Queue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = QueueQuerySet.as_manager()
+    
     class Meta:
         ordering = ['position']
         unique_together = ['doctor', 'position']
     
     def __str__(self):
-        return f"Queue {self.position}: {self.appointment.patient.get_full_name()}"
+        return f"Queue {self.position}: {self.appointment.patient_full_name}"
+    
+    @classmethod
+    def enqueue(cls, appointment, doctor, refresh=True):
+        """Append an appointment to the end of a doctor's queue in a single INSERT, with the position
+        and wait computed from the doctor's current last position inside the statement. Two concurrent
+        INSERTs can still read the same last position, so the doctor's row is locked first to queue them
+        up (a no-op on SQLite, which serializes writes anyway).
+        Callers that don't read the returned entry pass refresh=False to skip reading them back."""
+        last_position = Coalesce(Subquery(
+            cls.objects.filter(doctor=doctor).order_by().values('doctor').annotate(
+                last=Max('position')
+            ).values('last')
+        ), 0)
+        with transaction.atomic():
+            # Locks a row that exists even when the queue is empty, unlike the doctor's queue entries
+            list(type(doctor).objects.select_for_update().filter(pk=doctor.pk).values_list('pk'))
+            entry = cls.objects.create(
+                appointment=appointment,
+                doctor=doctor,
+                position=last_position + 1,
+                estimated_wait_time=last_position * 20  # 20 minutes per patient
+            )
+        if refresh:
+            # The instance holds the expressions, not the values the database computed
+            entry.refresh_from_db(fields=['position', 'estimated_wait_time'])
+        return entry
     
     def move_to_next_position(self):
         """Move this queue entry to the next position"""
         self.position += 1
-        self.save()
+        self.save(update_fields=['position', 'updated_at'])
     
     def remove_from_queue(self):
         """Remove this entry from queue and adjust positions"""
-        # Get all entries with higher positions
-        higher_entries = Queue.objects.filter(
-            doctor=self.doctor,
-            position__gt=self.position
-        )
-        
-        # Decrease their positions by 1
-        for entry in higher_entries:
-            entry.position -= 1
-            entry.save()
-        
-        # Delete this entry
-        self.delete()
+        with transaction.atomic():
+            position = self.position
+            self.delete()
+            
+            # Shift every later entry up by one, and its wait down by one slot, in two set-based
+            # UPDATEs. Rows are updated in no particular order, so they are first parked at
+            # negative positions to keep (doctor, position) unique at every step.
+            higher_entries = Queue.objects.filter(doctor_id=self.doctor_id, position__gt=position)
+            higher_entries.update(position=-F('position'))
+            Queue.objects.filter(doctor_id=self.doctor_id, position__lt=-position).update(
+                position=-F('position') - 1,
+                estimated_wait_time=Greatest(F('estimated_wait_time') - 20, 0),  # 20 minutes per patient
+                updated_at=timezone.now()
+            )
 
 
 class ClinicSettings(models.Model):
@@ -184,8 +289,63 @@ class ClinicSettings(models.Model):
     def __str__(self):
         return f"Settings for {self.clinic_name}"
     
+    CACHE_KEY = 'clinic:settings'
+    # Short TTL bounds staleness in per-process caches (LocMemCache) that never see another process's signals
+    CACHE_TIMEOUT = 60
+    
     @classmethod
     def get_settings(cls):
-        """Get or create clinic settings"""
+        """Get or create clinic settings, shared through the cache until they are saved"""
+        return cache.get_or_set(cls.CACHE_KEY, cls._load_settings, cls.CACHE_TIMEOUT)
+    
+    @classmethod
+    def _load_settings(cls):
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
+
+
+@receiver(post_save, sender=ClinicSettings)
+@receiver(post_delete, sender=ClinicSettings)
+def invalidate_clinic_settings(sender, **kwargs):
+    cache.delete(sender.CACHE_KEY)
+
+
+@receiver(pre_save, sender=Appointment)
+def set_appointment_names(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'patient', 'doctor'} & set(update_fields):
+        return
+    # Names only need reading when the patient or doctor changed; other saves skip both SELECTs
+    if not instance.patient_full_name or instance.has_changed('patient_id'):
+        instance.patient_full_name = instance.patient.full_name
+    if not instance.doctor_full_name or instance.has_changed('doctor_id'):
+        instance.doctor_full_name = instance.doctor.get_full_name()
+
+
+@receiver(post_save, sender=Appointment)
+def refresh_appointment_is_emergency(sender, instance, created, update_fields=None, **kwargs):
+    # The database recomputes is_emergency on every write, but only an INSERT returns it to the instance
+    refresh = not created and (update_fields is None or {'appointment_type', 'priority'} & set(update_fields)) and (
+        instance.has_changed('appointment_type') or instance.has_changed('priority')
+    )
+    instance.track_loaded_values()
+    if refresh:
+        instance.refresh_from_db(fields=['is_emergency'])
+
+
+@receiver(post_save, sender=Patient)
+def sync_appointment_patient_names(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    Appointment.objects.filter(patient=instance).exclude(
+        patient_full_name=instance.full_name
+    ).update(patient_full_name=instance.full_name)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_appointment_doctor_names(sender, instance, update_fields=None, **kwargs):
+    # Logins save the user with update_fields=['last_login']
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    Appointment.objects.filter(doctor=instance).exclude(
+        doctor_full_name=instance.get_full_name()
+    ).update(doctor_full_name=instance.get_full_name())
@@ -2,97 +2,162 @@ from rest_framework import serializers
 from .models import Appointment, Queue, ClinicSettings
 from patients.models import Patient
 from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
 from django.utils import timezone
+from datetime import timedelta
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
-    """Serializer for Appointment model"""
+class AppointmentOverlapMixin:
+    """Rejects an appointment that overlaps another active appointment of the same doctor: with a
+    query on databases other than PostgreSQL, and by reporting a write rejected by the no-overlap
+    exclusion constraint as a validation error on PostgreSQL"""
+    
+    def validate(self, data):
+        """Check the doctor is available at the scheduled time"""
+        scheduled_time = data.get('scheduled_time')
+        doctor = data.get('doctor')
+        appointment_id = self.instance.id if self.instance else None
+        
+        # PostgreSQL enforces this with an exclusion constraint, which also holds under concurrent writes
+        if scheduled_time and doctor and connection.vendor != 'postgresql':
+            if 'estimated_duration' in data:
+                duration = data['estimated_duration']
+            elif self.instance:
+                duration = self.instance.estimated_duration
+            else:
+                duration = Appointment._meta.get_field('estimated_duration').default
+            window_end = scheduled_time + timedelta(minutes=duration)
+            
+            # Active appointments that start before this one ends, a range on the
+            # (doctor, status, scheduled_time) index; only their end times are fetched
+            candidates = Appointment.objects.filter(
+                doctor=doctor,
+                status__in=['scheduled', 'waiting', 'in_progress'],
+                scheduled_time__lt=window_end
+            ).filter(
+                Q(actual_end_time__isnull=True) | Q(actual_end_time__gte=scheduled_time)
+            ).exclude(id=appointment_id).values_list('scheduled_time', 'estimated_duration', 'actual_end_time')
+            
+            # Without an actual end time an appointment runs for its estimated duration
+            overlapping = any(
+                actual_end_time is not None or start + timedelta(minutes=minutes) > scheduled_time
+                for start, minutes, actual_end_time in candidates
+            )
+            
+            if overlapping:
+                raise serializers.ValidationError(
+                    "Doctor has another appointment at this time"
+                )
+        
+        return data
+    
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as e:
+            if Appointment.NO_OVERLAP_CONSTRAINT not in str(e):
+                raise
+            raise serializers.ValidationError("Doctor has another appointment at this time")
+
+
+class AppointmentSerializer(AppointmentOverlapMixin, serializers.ModelSerializer):
+    """Serializer for Appointment model.
+    
+    Every field reads a column of the appointment row itself (names are denormalized, related
+    objects are emitted as ids), so list querysets need no select_related or prefetch_related.
+    """
     
     # Related field serializers
-    patient_name = serializers.CharField(source='patient.get_full_name', read_only=True)
-    patient_id = serializers.IntegerField(source='patient.id', read_only=True)
-    doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
-    doctor_id = serializers.IntegerField(source='doctor.id', read_only=True)
+    patient_name = serializers.CharField(source='patient_full_name', read_only=True)
+    patient_id = serializers.IntegerField(read_only=True)
+    doctor_name = serializers.CharField(source='doctor_full_name', read_only=True)
+    doctor_id = serializers.IntegerField(read_only=True)
     
     # Computed fields
     is_emergency = serializers.BooleanField(read_only=True)
     is_waiting = serializers.BooleanField(read_only=True)
+    # Annotated by Appointment.objects.with_estimated_wait_time()
     estimated_wait_time = serializers.IntegerField(read_only=True)
     status_color = serializers.CharField(source='get_status_display_color', read_only=True)
     priority_color = serializers.CharField(source='get_priority_display_color', read_only=True)
     
-    # Formatted time fields
-    scheduled_time_formatted = serializers.SerializerMethodField()
-    created_at_formatted = serializers.SerializerMethodField()
-    
     class Meta:
         model = Appointment
         fields = [
             'id', 'patient', 'patient_id', 'patient_name',
             'doctor', 'doctor_id', 'doctor_name',
-            'appointment_type', 'scheduled_time', 'scheduled_time_formatted',
+            'appointment_type', 'scheduled_time',
             'estimated_duration', 'reason', 'diagnosis', 'notes',
             'status', 'priority', 'queue_position',
             'actual_start_time', 'actual_end_time',
             'is_emergency', 'is_waiting', 'estimated_wait_time',
             'status_color', 'priority_color',
-            'created_at', 'created_at_formatted', 'updated_at'
+            'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'patient_name', 'patient_id', 'doctor_name', 'doctor_id',
             'is_emergency', 'is_waiting', 'estimated_wait_time',
-            'status_color', 'priority_color', 'scheduled_time_formatted',
-            'created_at_formatted', 'created_at', 'updated_at'
+            'status_color', 'priority_color', 'created_at', 'updated_at'
         ]
     
-    def get_scheduled_time_formatted(self, obj):
-        """Format scheduled time for display"""
-        return obj.scheduled_time.strftime('%Y-%m-%d %H:%M')
-    
-    def get_created_at_formatted(self, obj):
-        """Format created time for display"""
-        return obj.created_at.strftime('%Y-%m-%d %H:%M')
-    
     def validate_scheduled_time(self, value):
         """Validate scheduled time - Allow past times for flexibility"""
         # Remove strict future validation to allow doctors to start consultations early
         # or handle appointments that were scheduled in the past
         return value
+
+
+# Free-text columns the appointment list never displays; the detail endpoint still returns them
+APPOINTMENT_DETAIL_ONLY_FIELDS = ('diagnosis', 'notes')
+
+
+class AppointmentListSerializer(AppointmentSerializer):
+    """AppointmentSerializer without the detail-only text fields, for querysets limited to COLUMNS"""
     
-    def validate(self, data):
-        """Validate appointment data"""
-        # Check if doctor is available at scheduled time
-        scheduled_time = data.get('scheduled_time')
-        doctor = data.get('doctor')
-        appointment_id = self.instance.id if self.instance else None
-        
-        if scheduled_time and doctor:
-            # Check for overlapping appointments
-            overlapping = Appointment.objects.filter(
-                doctor=doctor,
-                scheduled_time__lte=scheduled_time,
-                actual_end_time__gte=scheduled_time,
-                status__in=['scheduled', 'waiting', 'in_progress']
-            ).exclude(id=appointment_id)
-            
-            if overlapping.exists():
-                raise serializers.ValidationError(
-                    "Doctor has another appointment at this time"
-                )
-        
-        return data
+    # Model columns the fields read, for .only() on list querysets
+    COLUMNS = (
+        'patient', 'patient_full_name', 'doctor', 'doctor_full_name',
+        'appointment_type', 'scheduled_time', 'estimated_duration', 'reason',
+        'status', 'priority', 'queue_position', 'actual_start_time', 'actual_end_time',
+        'is_emergency', 'created_at', 'updated_at',
+    )
+    
+    class Meta(AppointmentSerializer.Meta):
+        fields = [field for field in AppointmentSerializer.Meta.fields if field not in APPOINTMENT_DETAIL_ONLY_FIELDS]
+
+
+class AppointmentQueueSummarySerializer(serializers.ModelSerializer):
+    """The appointment fields a queue row needs; the full AppointmentSerializer is opt-in"""
+    
+    class Meta:
+        model = Appointment
+        fields = ['id', 'appointment_type', 'scheduled_time', 'priority', 'status']
+        read_only_fields = fields
 
 
 class QueueSerializer(serializers.ModelSerializer):
-    """Serializer for Queue model"""
+    """Serializer for Queue model.
+    
+    The nested appointment is a summary unless the request asks for ?expand=appointment.
+    """
+    
+    # Columns read when the appointment is not expanded, for .only() on list querysets
+    SUMMARY_COLUMNS = (
+        'doctor', 'position', 'estimated_wait_time', 'called_at', 'created_at', 'updated_at',
+        'appointment__appointment_type', 'appointment__scheduled_time', 'appointment__priority',
+        'appointment__status', 'appointment__reason', 'appointment__is_emergency',
+        'appointment__patient_full_name', 'appointment__doctor_full_name',
+    )
     
     # Related field serializers
-    appointment = AppointmentSerializer(read_only=True)
+    appointment = AppointmentQueueSummarySerializer(read_only=True)
     appointment_id = serializers.IntegerField(write_only=True)
-    doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+    doctor_name = serializers.CharField(source='appointment.doctor_full_name', read_only=True)
     
     # Computed fields
-    patient_name = serializers.CharField(source='appointment.patient.get_full_name', read_only=True)
+    patient_name = serializers.CharField(source='appointment.patient_full_name', read_only=True)
     reason = serializers.CharField(source='appointment.reason', read_only=True)
     appointment_type = serializers.CharField(source='appointment.appointment_type', read_only=True)
     priority = serializers.IntegerField(source='appointment.priority', read_only=True)
@@ -110,6 +175,16 @@ class QueueSerializer(serializers.ModelSerializer):
             'id', 'appointment', 'doctor_name', 'patient_name', 'reason',
             'appointment_type', 'priority', 'is_emergency', 'created_at', 'updated_at'
         ]
+    
+    @staticmethod
+    def expands_appointment(request):
+        return request is not None and request.query_params.get('expand') == 'appointment'
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.expands_appointment(self.context.get('request')):
+            fields['appointment'] = AppointmentSerializer(read_only=True)
+        return fields
 
 
 class ClinicSettingsSerializer(serializers.ModelSerializer):
@@ -126,7 +201,7 @@ class ClinicSettingsSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class AppointmentCreateSerializer(serializers.ModelSerializer):
+class AppointmentCreateSerializer(AppointmentOverlapMixin, serializers.ModelSerializer):
     """Simplified serializer for creating appointments"""
     
     class Meta:
@@ -168,20 +243,19 @@ class AppointmentStatusUpdateSerializer(serializers.ModelSerializer):
         """Validate status transition - Allow flexible transitions for real-world clinic workflow"""
         if self.instance:
             current_status = self.instance.status
-            valid_transitions = {
-                'scheduled': ['waiting', 'in_progress', 'cancelled'],  # Allow direct start from scheduled
-                'waiting': ['in_progress', 'cancelled', 'no_show'],
-                'in_progress': ['completed', 'cancelled'],
-                'completed': [],  # Terminal state
-                'cancelled': [],  # Terminal state
-                'no_show': [],    # Terminal state
-            }
             
             # Allow any transition if doctor is taking action (real-world flexibility)
             # Only restrict terminal states from being changed
-            if current_status in ['completed', 'cancelled', 'no_show'] and value != current_status:
+            if current_status in Appointment.TERMINAL_STATUSES and value != current_status:
                 raise serializers.ValidationError(
                     f"Cannot change status from terminal state {current_status} to {value}"
                 )
         
         return value
+    
+    def update(self, instance, validated_data):
+        """Write only the submitted columns"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
@@ -0,0 +1,256 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from patients.models import Patient
+from clinic.models import Appointment, Queue
+from clinic.serializers import AppointmentCreateSerializer, AppointmentSerializer
+from clinic.views import (
+    AppointmentDetailView, AppointmentListCreateView, clinic_dashboard_stats, dashboard_stats, remove_from_queue
+)
+
+User = get_user_model()
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        patient = Patient.objects.create(
+            first_name='Sam', last_name='Roe', date_of_birth=date(1980, 1, 1), gender='M', phone='1', address='a'
+        )
+        appointment = Appointment.objects.create(
+            patient=patient, doctor=self.doctor, reason='checkup', status='waiting',
+            scheduled_time=timezone.make_aware(datetime.combine(self.today, time(12)))
+        )
+        Queue.enqueue(appointment, self.doctor)
+        Queue.objects.update(estimated_wait_time=25)
+    
+    def get(self, **headers):
+        request = APIRequestFactory().get('/api/clinic/dashboard/stats/', **headers)
+        force_authenticate(request, self.doctor)
+        return clinic_dashboard_stats(request)
+    
+    def test_average_wait_time_is_a_float(self):
+        stats = dashboard_stats(self.today)
+        self.assertEqual(stats['queue_stats']['average_wait_time'], 25.0)
+        self.assertIsInstance(stats['queue_stats']['average_wait_time'], float)
+        self.assertEqual(stats['appointment_stats']['waiting_today'], 1)
+    
+    def test_etag_and_not_modified_with_a_non_empty_queue(self):
+        stats = dashboard_stats(self.today)
+        # PostgreSQL hands back numeric aggregates as Decimals
+        stats['queue_stats']['average_wait_time'] = Decimal('25.0')
+        with mock.patch('clinic.views.dashboard_stats', return_value=stats):
+            response = self.get()
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['ETag'])
+            
+            revalidated = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+
+
+class AppointmentSaveTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        self.patient = Patient.objects.create(
+            first_name='Sam', last_name='Roe', date_of_birth=date(1980, 1, 1), gender='M', phone='1', address='a'
+        )
+        self.appointment = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, reason='checkup', scheduled_time=timezone.now()
+        )
+    
+    def test_names_are_set_on_create(self):
+        self.assertEqual(self.appointment.patient_full_name, self.patient.full_name)
+        self.assertEqual(self.appointment.doctor_full_name, 'Ann Lee')
+    
+    def test_full_save_of_a_loaded_appointment_skips_the_name_and_is_emergency_reads(self):
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.notes = 'seen'
+        with self.assertNumQueries(1):  # Just the UPDATE
+            appointment.save()
+        appointment.notes = 'seen again'
+        with self.assertNumQueries(1):
+            appointment.save()
+    
+    def test_changing_the_doctor_updates_the_doctor_name(self):
+        other = User.objects.create_user('other', password='pw', first_name='Bo', last_name='Kim')
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        appointment.doctor_id = other.pk
+        appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.doctor_full_name, 'Bo Kim')
+        self.assertEqual(appointment.patient_full_name, self.patient.full_name)
+    
+    def test_raising_the_priority_refreshes_is_emergency(self):
+        appointment = Appointment.objects.get(pk=self.appointment.pk)
+        self.assertFalse(appointment.is_emergency)
+        appointment.priority = 1
+        appointment.save()
+        self.assertTrue(appointment.is_emergency)
+        appointment.priority = 3
+        appointment.save(update_fields=['priority'])
+        self.assertFalse(appointment.is_emergency)
+
+
+class AppointmentSerializerQueryTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        start = timezone.now()
+        for i in range(5):
+            patient = Patient.objects.create(
+                first_name=f'Pat{i}', last_name='Roe', date_of_birth=date(1980, 1, 1), gender='F', phone='1', address='a'
+            )
+            self.appointment = Appointment.objects.create(
+                patient=patient, doctor=self.doctor, reason='checkup', status='waiting',
+                scheduled_time=start + timedelta(hours=i)
+            )
+    
+    def get(self, view, **kwargs):
+        request = APIRequestFactory().get('/api/clinic/appointments/')
+        force_authenticate(request, self.doctor)
+        response = view.as_view()(request, **kwargs)
+        response.render()
+        return response
+    
+    def test_list_reads_every_appointment_in_one_query(self):
+        # Names are denormalized and related objects are emitted as ids, so nothing is joined or prefetched
+        with self.assertNumQueries(1):
+            response = self.get(AppointmentListCreateView)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['patient_name'], 'Pat0 Roe')
+        self.assertEqual(response.data[0]['doctor_name'], 'Ann Lee')
+    
+    def test_detail_reads_the_appointment_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.get(AppointmentDetailView, pk=self.appointment.pk)
+        self.assertEqual(response.data['patient_name'], 'Pat4 Roe')
+
+
+class AppointmentOverlapTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        self.patient = Patient.objects.create(
+            first_name='Sam', last_name='Roe', date_of_birth=date(1980, 1, 1), gender='M', phone='1', address='a'
+        )
+        self.ten = timezone.make_aware(datetime.combine(timezone.now().date(), time(10)))
+        # 10:00-10:30
+        self.existing = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, reason='checkup', scheduled_time=self.ten, estimated_duration=30
+        )
+    
+    def data(self, start, duration=30):
+        return {
+            'patient': self.patient.pk, 'doctor': self.doctor.pk, 'appointment_type': 'normal',
+            'scheduled_time': start, 'reason': 'follow up', 'priority': 3, 'estimated_duration': duration,
+        }
+    
+    def is_valid(self, start, duration=30, serializer_class=AppointmentCreateSerializer):
+        return serializer_class(data=self.data(start, duration)).is_valid()
+    
+    def test_window_overlaps(self):
+        self.assertFalse(self.is_valid(self.ten + timedelta(minutes=15)))
+        self.assertFalse(self.is_valid(self.ten - timedelta(minutes=15), duration=30))
+        self.assertFalse(self.is_valid(self.ten - timedelta(minutes=15), duration=90))
+    
+    def test_back_to_back_appointments_do_not_overlap(self):
+        self.assertTrue(self.is_valid(self.ten + timedelta(minutes=30)))
+        self.assertTrue(self.is_valid(self.ten - timedelta(minutes=15), duration=15))
+    
+    def test_both_serializers_check_overlaps(self):
+        for serializer_class in (AppointmentCreateSerializer, AppointmentSerializer):
+            with self.subTest(serializer_class.__name__):
+                self.assertFalse(self.is_valid(self.ten + timedelta(minutes=15), serializer_class=serializer_class))
+    
+    def test_a_finished_appointment_only_blocks_until_its_actual_end(self):
+        self.existing.status = 'in_progress'
+        self.existing.actual_end_time = self.ten + timedelta(minutes=10)
+        self.existing.save()
+        self.assertTrue(self.is_valid(self.ten + timedelta(minutes=15)))
+        self.assertFalse(self.is_valid(self.ten + timedelta(minutes=5)))
+    
+    def test_inactive_appointments_do_not_block(self):
+        self.existing.status = 'cancelled'
+        self.existing.save()
+        self.assertTrue(self.is_valid(self.ten + timedelta(minutes=15)))
+    
+    def test_updating_an_appointment_ignores_itself(self):
+        serializer = AppointmentSerializer(self.existing, data=self.data(self.ten + timedelta(minutes=5)))
+        self.assertTrue(serializer.is_valid())
+    
+    def test_constraint_violation_is_reported_as_a_validation_error(self):
+        serializer = AppointmentCreateSerializer(data=self.data(self.ten + timedelta(hours=2)))
+        self.assertTrue(serializer.is_valid())
+        violation = IntegrityError(f'conflicting key value violates exclusion constraint "{Appointment.NO_OVERLAP_CONSTRAINT}"')
+        with mock.patch('rest_framework.serializers.ModelSerializer.save', side_effect=violation):
+            with self.assertRaisesMessage(serializers.ValidationError, 'Doctor has another appointment at this time'):
+                serializer.save()
+    
+    def test_other_integrity_errors_are_raised(self):
+        serializer = AppointmentCreateSerializer(data=self.data(self.ten + timedelta(hours=2)))
+        self.assertTrue(serializer.is_valid())
+        with mock.patch('rest_framework.serializers.ModelSerializer.save', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                serializer.save()
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user('doctor', password='pw', first_name='Ann', last_name='Lee')
+        self.other_doctor = User.objects.create_user('other', password='pw', first_name='Bo', last_name='Kim')
+        patient = Patient.objects.create(
+            first_name='Sam', last_name='Roe', date_of_birth=date(1980, 1, 1), gender='M', phone='1', address='a'
+        )
+        start = timezone.now()
+        self.appointments = [
+            Appointment.objects.create(
+                patient=patient, doctor=self.doctor, reason='checkup', status='waiting',
+                scheduled_time=start + timedelta(hours=i)
+            )
+            for i in range(4)
+        ]
+        self.entries = [Queue.enqueue(appointment, self.doctor) for appointment in self.appointments]
+        # Another doctor's queue must not be touched
+        other = Appointment.objects.create(
+            patient=patient, doctor=self.other_doctor, reason='checkup', status='waiting', scheduled_time=start
+        )
+        self.other_entry = Queue.enqueue(other, self.other_doctor)
+    
+    def queue(self):
+        return list(Queue.objects.filter(doctor=self.doctor).values_list('appointment_id', 'position', 'estimated_wait_time'))
+    
+    def test_enqueue_appends_to_the_doctors_queue(self):
+        self.assertEqual(
+            [(entry.position, entry.estimated_wait_time) for entry in self.entries],
+            [(1, 0), (2, 20), (3, 40), (4, 60)]
+        )
+        self.assertEqual((self.other_entry.position, self.other_entry.estimated_wait_time), (1, 0))
+    
+    def test_removing_from_the_middle_moves_later_entries_up(self):
+        self.entries[1].remove_from_queue()
+        ids = [appointment.id for appointment in self.appointments]
+        self.assertEqual(self.queue(), [(ids[0], 1, 0), (ids[2], 2, 20), (ids[3], 3, 40)])
+        self.other_entry.refresh_from_db()
+        self.assertEqual(self.other_entry.position, 1)
+        # The next entry goes after the repacked queue
+        self.assertEqual(Queue.enqueue(self.appointments[1], self.doctor).position, 4)
+    
+    def test_remove_from_queue_view_completes_the_appointment(self):
+        request = APIRequestFactory().post(
+            '/api/clinic/queue/remove/', {'appointment_id': self.appointments[0].id}, format='json'
+        )
+        force_authenticate(request, self.doctor)
+        response = remove_from_queue(request)
+        self.assertEqual(response.status_code, 200)
+        ids = [appointment.id for appointment in self.appointments]
+        self.assertEqual(self.queue(), [(ids[1], 1, 0), (ids[2], 2, 20), (ids[3], 3, 40)])
+        self.assertEqual(Appointment.objects.get(pk=ids[0]).status, 'completed')
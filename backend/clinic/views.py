@@ -3,22 +3,43 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg, Max
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Prefetch
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from datetime import datetime, timedelta
+import hashlib
+import json
 import logging
 
 from .models import Appointment, Queue, ClinicSettings
 from .serializers import (
-    AppointmentSerializer, QueueSerializer, ClinicSettingsSerializer,
+    AppointmentSerializer, AppointmentListSerializer, QueueSerializer, ClinicSettingsSerializer,
     AppointmentCreateSerializer, QueueUpdateSerializer, AppointmentStatusUpdateSerializer
 )
 from patients.models import Patient
 from django.conf import settings
 
+User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
+def active_queue(request, doctor_id):
+    """The doctor's active queue, reading only the columns QueueSerializer needs
+    unless the full appointment is expanded"""
+    queryset = Queue.objects.active_for_doctor(doctor_id)
+    if QueueSerializer.expands_appointment(request):
+        # Prefetched rather than joined so the full appointment carries its estimated_wait_time annotation
+        return queryset.prefetch_related(Prefetch(
+            'appointment', queryset=Appointment.objects.with_estimated_wait_time()
+        ))
+    return queryset.select_related('appointment').only(*QueueSerializer.SUMMARY_COLUMNS)
+
+
 class AppointmentListCreateView(generics.ListCreateAPIView):
     """List and create appointments"""
     permission_classes = [IsAuthenticated]
@@ -31,11 +52,13 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return AppointmentCreateSerializer
-        return AppointmentSerializer
+        return AppointmentListSerializer
     
     def get_queryset(self):
         """Filter appointments based on user role and permissions"""
-        queryset = Appointment.objects.select_related('patient', 'doctor').all()
+        queryset = Appointment.objects.with_estimated_wait_time()
+        if self.request.method == 'GET':
+            queryset = queryset.only(*AppointmentListSerializer.COLUMNS)
         
         # Filter by doctor if specified in query params
         doctor_id = self.request.query_params.get('doctor')
@@ -51,23 +74,10 @@ class AppointmentListCreateView(generics.ListCreateAPIView):
         """Set created_by when creating appointment and add to queue"""
         appointment = serializer.save(created_by=self.request.user)
         
-        # Automatically add appointment to doctor's queue
+        # Automatically add appointment to doctor's queue (a new appointment has no entry yet)
         try:
-            # Check if already in queue
-            if not Queue.objects.filter(appointment=appointment).exists():
-                # Get next position in queue
-                last_position = Queue.objects.filter(doctor=appointment.doctor).aggregate(
-                    max_pos=Max('position')
-                )['max_pos'] or 0
-                
-                # Create queue entry
-                Queue.objects.create(
-                    appointment=appointment,
-                    doctor=appointment.doctor,
-                    position=last_position + 1,
-                    estimated_wait_time=last_position * 20  # 20 minutes per patient
-                )
-                logger.info(f"Appointment {appointment.id} automatically added to queue for doctor {appointment.doctor.id}")
+            Queue.enqueue(appointment, appointment.doctor, refresh=False)
+            logger.info(f"Appointment {appointment.id} automatically added to queue for doctor {appointment.doctor_id}")
         except Exception as e:
             logger.error(f"Failed to add appointment {appointment.id} to queue: {str(e)}")
             # Don't fail the appointment creation if queue addition fails
@@ -79,7 +89,7 @@ class AppointmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AppointmentSerializer
     
     def get_queryset(self):
-        return Appointment.objects.select_related('patient', 'doctor').all()
+        return Appointment.objects.with_estimated_wait_time()
 
 
 class QueueListView(generics.ListAPIView):
@@ -93,17 +103,11 @@ class QueueListView(generics.ListAPIView):
         """Get queue entries for the current doctor"""
         doctor_id = self.request.query_params.get('doctor')
         if doctor_id:
-            return Queue.objects.filter(
-                doctor_id=doctor_id,
-                appointment__status__in=['waiting', 'in_progress']
-            ).select_related('appointment__patient', 'doctor').order_by('position')
+            return active_queue(self.request, doctor_id)
         
         # Default to current user if they're a doctor
         if hasattr(self.request.user, 'role') and self.request.user.role == 'doctor':
-            return Queue.objects.filter(
-                doctor=self.request.user,
-                appointment__status__in=['waiting', 'in_progress']
-            ).select_related('appointment__patient', 'doctor').order_by('position')
+            return active_queue(self.request, self.request.user.pk)
         
         return Queue.objects.none()
 
@@ -128,36 +132,24 @@ def add_to_queue(request):
         if not appointment_id:
             return Response({'error': 'appointment_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        appointment = Appointment.objects.get(id=appointment_id)
+        appointment = Appointment.objects.select_related('doctor').get(id=appointment_id)
         
         # Use provided doctor_id or default to appointment's doctor
-        from django.apps import apps
-        User = apps.get_model('users', 'User')
         doctor = User.objects.get(id=doctor_id) if doctor_id else appointment.doctor
         
         # Check if already in queue
         if Queue.objects.filter(appointment=appointment).exists():
             return Response({'error': 'Appointment already in queue'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get next position in queue
-        last_position = Queue.objects.filter(doctor=doctor).aggregate(
-            max_pos=Max('position')
-        )['max_pos'] or 0
-        
-        # Create queue entry
-        queue_entry = Queue.objects.create(
-            appointment=appointment,
-            doctor=doctor,
-            position=last_position + 1,
-            estimated_wait_time=last_position * 20  # 20 minutes per patient
-        )
+        # Create queue entry at the end of the doctor's queue
+        queue_entry = Queue.enqueue(appointment, doctor)
         
         # Update appointment status
         appointment.status = 'waiting'
         appointment.queue_position = queue_entry.position
-        appointment.save()
+        appointment.save(update_fields=['status', 'queue_position', 'updated_at'])
         
-        serializer = QueueSerializer(queue_entry)
+        serializer = QueueSerializer(queue_entry, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
     except Appointment.DoesNotExist:
@@ -184,13 +176,14 @@ def remove_from_queue(request):
         else:
             return Response({'error': 'queue_id or appointment_id is required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Remove from queue and adjust positions
-        queue_entry.remove_from_queue()
-        
-        # Update appointment status
-        appointment = queue_entry.appointment
-        appointment.status = 'completed'
-        appointment.save()
+        with transaction.atomic():
+            # Remove from queue and adjust positions
+            queue_entry.remove_from_queue()
+            
+            # Update appointment status, writing only that column
+            Appointment.objects.filter(pk=queue_entry.appointment_id).update(
+                status='completed', updated_at=timezone.now()
+            )
         
         return Response({'message': 'Removed from queue successfully'}, status=status.HTTP_200_OK)
         
@@ -210,18 +203,16 @@ def update_appointment_status(request, appointment_id):
         serializer = AppointmentStatusUpdateSerializer(appointment, data=request.data, partial=True)
         
         if serializer.is_valid():
-            serializer.save()
-            
+            timestamps = {}
             # If status changed to in_progress, update actual_start_time
             if serializer.validated_data.get('status') == 'in_progress' and not appointment.actual_start_time:
-                appointment.actual_start_time = timezone.now()
-                appointment.save()
+                timestamps['actual_start_time'] = timezone.now()
             
             # If status changed to completed, update actual_end_time
             elif serializer.validated_data.get('status') == 'completed' and not appointment.actual_end_time:
-                appointment.actual_end_time = timezone.now()
-                appointment.save()
+                timestamps['actual_end_time'] = timezone.now()
             
+            serializer.save(**timestamps)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -233,69 +224,111 @@ def update_appointment_status(request, appointment_id):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Dashboard counts may lag writes by this long; every client polling it shares one computation
+DASHBOARD_STATS_TIMEOUT = 30
+# How long a polling client may reuse a dashboard response before revalidating it
+DASHBOARD_STATS_MAX_AGE = 15
+
+
+# One round-trip for the whole dashboard: a totals row (with the queue counts as scalar
+# subqueries) followed by one row per doctor, over a single range scan of the day's
+# appointments. FILTER needs PostgreSQL or SQLite 3.30+. On PostgreSQL the day's rows are
+# read from the covering index appt_day_stats_idx (Appointment.Meta.indexes) without touching the table.
+DASHBOARD_STATS_SQL = """
+SELECT 0 AS row_kind, NULL AS doctor_id, NULL AS doctor_name,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE status = 'completed'),
+       COUNT(*) FILTER (WHERE status = 'waiting'),
+       COUNT(*) FILTER (WHERE status = 'in_progress'),
+       COUNT(*) FILTER (WHERE priority = 1),
+       (SELECT COUNT(*) FROM clinic_queue q JOIN clinic_appointment qa ON qa.id = q.appointment_id
+        WHERE qa.status = 'waiting'),
+       (SELECT COUNT(*) FROM clinic_queue q JOIN clinic_appointment qa ON qa.id = q.appointment_id
+        WHERE qa.status = 'in_progress'),
+       (SELECT AVG(estimated_wait_time) FROM clinic_queue)
+FROM clinic_appointment
+WHERE scheduled_time >= %s AND scheduled_time < %s
+UNION ALL
+SELECT 1, doctor_id, doctor_full_name,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE status = 'completed'),
+       COUNT(*) FILTER (WHERE status = 'waiting'),
+       COUNT(*) FILTER (WHERE status = 'in_progress'),
+       NULL, NULL, NULL, NULL
+FROM clinic_appointment
+WHERE scheduled_time >= %s AND scheduled_time < %s
+GROUP BY doctor_id, doctor_full_name
+ORDER BY 1, 2
+"""
+
+
+def dashboard_stats(today):
+    """Queue, appointment and per-doctor workload counts for the given day"""
+    # Today's appointments, as a range on the scheduled_time index rather than a cast of every row
+    day_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
+    day_range = [connection.ops.adapt_datetimefield_value(day_start),
+                 connection.ops.adapt_datetimefield_value(day_start + timedelta(days=1))]
+    with connection.cursor() as cursor:
+        cursor.execute(DASHBOARD_STATS_SQL, day_range * 2)
+        totals, *doctor_rows = cursor.fetchall()
+    
+    (_, _, _, total_today, completed_today, waiting_today, in_progress_today, emergency_today,
+     total_waiting, total_in_progress, average_wait_time) = totals
+    
+    # Queue statistics
+    queue_stats = {
+        'total_waiting': total_waiting,
+        'total_in_progress': total_in_progress,
+        # Default to 0 if no queue entries; PostgreSQL's AVG is numeric, which DRF would render as a string
+        'average_wait_time': round(float(average_wait_time), 1) if average_wait_time is not None else 0,
+    }
+    
+    # Appointment statistics
+    appointment_stats = {
+        'total_today': total_today,
+        'completed_today': completed_today,
+        'waiting_today': waiting_today,
+        'in_progress_today': in_progress_today,
+        'emergency_today': emergency_today,
+    }
+    
+    # Doctor workload, one row per doctor with appointments today
+    doctor_workload = [
+        {
+            'doctor_id': doctor_id,
+            'doctor_name': doctor_name,
+            'total_appointments': total,
+            'completed': completed,
+            'waiting': waiting,
+            'in_progress': in_progress,
+        }
+        for _, doctor_id, doctor_name, total, completed, waiting, in_progress, *_ in doctor_rows
+    ]
+    
+    return {
+        'queue_stats': queue_stats,
+        'appointment_stats': appointment_stats,
+        'doctor_workload': doctor_workload,
+        'date': today.isoformat(),
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def clinic_dashboard_stats(request):
     """Get clinic dashboard statistics"""
     try:
         today = timezone.now().date()
-        
-        # Today's appointments
-        today_appointments = Appointment.objects.filter(scheduled_time__date=today)
-        
-        # Queue statistics
-        queue_stats = {
-            'total_waiting': Queue.objects.filter(
-                appointment__status='waiting'
-            ).count(),
-            'total_in_progress': Queue.objects.filter(
-                appointment__status='in_progress'
-            ).count(),
-            'average_wait_time': 0,  # Default to 0 if no queue entries
-        }
-        
-        # Calculate average wait time if there are queue entries
-        queue_entries = Queue.objects.all()
-        if queue_entries.exists():
-            avg_wait = queue_entries.aggregate(avg_wait=Avg('estimated_wait_time'))['avg_wait']
-            queue_stats['average_wait_time'] = round(avg_wait or 0, 1)
-        
-        # Appointment statistics
-        appointment_stats = {
-            'total_today': today_appointments.count(),
-            'completed_today': today_appointments.filter(status='completed').count(),
-            'waiting_today': today_appointments.filter(status='waiting').count(),
-            'in_progress_today': today_appointments.filter(status='in_progress').count(),
-            'emergency_today': today_appointments.filter(priority=1).count(),
-        }
-        
-        # Doctor workload - handle case where no doctors have appointments today
-        doctor_workload = []
-        try:
-            from django.apps import apps
-            User = apps.get_model('users', 'User')
-            doctors = User.objects.filter(appointments__scheduled_time__date=today).distinct()
-            for doctor in doctors:
-                doctor_appointments = today_appointments.filter(doctor=doctor)
-                doctor_workload.append({
-                    'doctor_id': doctor.id,
-                    'doctor_name': doctor.get_full_name(),
-                    'total_appointments': doctor_appointments.count(),
-                    'completed': doctor_appointments.filter(status='completed').count(),
-                    'waiting': doctor_appointments.filter(status='waiting').count(),
-                    'in_progress': doctor_appointments.filter(status='in_progress').count(),
-                })
-        except Exception as e:
-            logger.warning(f"Could not fetch doctor workload: {e}")
-            # Provide empty doctor workload if there's an error
-            doctor_workload = []
-        
-        return Response({
-            'queue_stats': queue_stats,
-            'appointment_stats': appointment_stats,
-            'doctor_workload': doctor_workload,
-            'date': today.isoformat(),
-        }, status=status.HTTP_200_OK)
+        stats = cache.get_or_set(
+            f'clinic:dashboard_stats:{today.isoformat()}', lambda: dashboard_stats(today), DASHBOARD_STATS_TIMEOUT
+        )
+        # Clients revalidating with If-None-Match get an empty 304 while the stats are unchanged
+        digest = hashlib.md5(json.dumps(stats, sort_keys=True, cls=DjangoJSONEncoder).encode(), usedforsecurity=False).hexdigest()
+        etag = quote_etag(digest)
+        response = get_conditional_response(request, etag=etag) or Response(stats, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=DASHBOARD_STATS_MAX_AGE)
+        return response
         
     except Exception as e:
         logger.error(f"Error getting clinic dashboard stats: {e}")
@@ -309,12 +342,9 @@ def clinic_dashboard_stats(request):
 def doctor_queue(request, doctor_id):
     """Get doctor's current queue"""
     try:
-        queue_entries = Queue.objects.filter(
-            doctor_id=doctor_id,
-            appointment__status__in=['waiting', 'in_progress']
-        ).select_related('appointment__patient', 'doctor').order_by('position')
+        queue_entries = active_queue(request, doctor_id)
         
-        serializer = QueueSerializer(queue_entries, many=True)
+        serializer = QueueSerializer(queue_entries, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
         
     except Exception as e:
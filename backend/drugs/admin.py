@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import Drug, Allergy, Interaction
 
 @admin.register(Drug)
@@ -7,6 +8,7 @@ class DrugAdmin(admin.ModelAdmin):
     list_filter = ['therapeutic_class', 'availability', 'form']
     search_fields = ['name', 'generic_name']
     filter_horizontal = ['allergy_conflicts']
+    list_per_page = 50
 
 @admin.register(Allergy)
 class AllergyAdmin(admin.ModelAdmin):
@@ -20,9 +22,14 @@ class InteractionAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     filter_horizontal = ['drugs']
     
+    def get_queryset(self, request):
+        # Counted in the changelist query instead of one COUNT per row
+        return super().get_queryset(request).annotate(_drug_count=Count('drugs'))
+    
     def get_drug_count(self, obj):
-        return obj.drugs.count()
+        return obj._drug_count
     get_drug_count.short_description = 'Number of Drugs'
+    get_drug_count.admin_order_field = '_drug_count'
     
     fieldsets = (
         ('Basic Information', {
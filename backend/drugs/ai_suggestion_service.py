@@ -3,19 +3,26 @@ AI-Powered Medication Suggestion Service
 Provides advanced machine learning-based drug recommendations
 """
 
+import hashlib
+import os
+import threading
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import nltk
 from textblob import TextBlob
 import re
-from typing import List, Dict, Tuple, Optional
-from django.db.models import Q
+from typing import List, Dict, Set, Tuple, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from analytics.allergies import load_drug_allergy_conflicts
+from .caching import SUGGESTIONS_CACHE_TIMEOUT, drug_catalog_version, suggestions_cache_enabled, suggestions_version
 from .models import Drug, Allergy, Interaction
-from patients.models import Patient, PatientAllergy
+from patients.models import Patient
 from rx.models import Prescription, PrescriptionMedication
 import logging
 
@@ -27,6 +34,13 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     logging.warning("sentence-transformers not available. Some AI features will be disabled.")
 
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
 try:
     import spacy
     SPACY_AVAILABLE = True
@@ -36,12 +50,143 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+class OnnxSentenceEncoder:
+    """all-MiniLM-L6-v2 run by ONNX Runtime from an int8 export (settings.SENTENCE_MODEL_ONNX_DIR), with the
+    same mean pooling as SentenceTransformer; encode() takes the subset of SentenceTransformer.encode's arguments used here"""
+    MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length
+    
+    def __init__(self, model_dir: str):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1  # As torch gets in get_sentence_model()
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, 'model_int8.onnx'), options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+    
+    def encode(self, sentences: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            tokens = self.tokenizer(
+                sentences[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.MAX_SEQ_LENGTH, return_tensors='np'
+            )
+            token_embeddings = self.session.run(None, {name: tokens[name] for name in self.input_names})[0]
+            # Mean over the real (unpadded) tokens
+            mask = tokens['attention_mask'][:, :, None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+            batches.append(embeddings.astype(np.float32, copy=False))
+        return np.vstack(batches) if batches else np.empty((0, 384), dtype=np.float32)
+
+
+def sentence_model_available() -> bool:
+    """Whether get_sentence_model() has a backend to load"""
+    return SENTENCE_TRANSFORMERS_AVAILABLE or bool(ONNXRUNTIME_AVAILABLE and settings.SENTENCE_MODEL_ONNX_DIR)
+
+
+SENTENCE_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_sentence_model = None
+_sentence_model_lock = threading.Lock()
+
+
+def get_sentence_model():
+    """The process-wide sentence encoder, loaded on first use and shared by every service instance:
+    the int8 ONNX export when one is configured, otherwise SentenceTransformer"""
+    global _sentence_model
+    if _sentence_model is None:
+        with _sentence_model_lock:
+            if _sentence_model is None:
+                if ONNXRUNTIME_AVAILABLE and settings.SENTENCE_MODEL_ONNX_DIR:
+                    _sentence_model = OnnxSentenceEncoder(settings.SENTENCE_MODEL_ONNX_DIR)
+                else:
+                    import torch
+                    # Requests already run in parallel threads; one intra-op thread each avoids oversubscribing the CPU
+                    torch.set_num_threads(1)
+                    _sentence_model = SentenceTransformer(SENTENCE_MODEL_NAME, device='cpu')  # Force CPU to avoid GPU issues
+    return _sentence_model
+
+
+def top_indices(similarities, k):
+    """Indices of the k highest similarities, highest first, without sorting the whole array"""
+    k = min(k, similarities.size)
+    if k <= 0:
+        return np.array([], dtype=int)
+    top = np.argpartition(similarities, -k)[-k:]
+    return top[np.argsort(similarities[top])[::-1]]
+
+
+# Condition keyword -> related medical terms, for TF-IDF queries (_expand_condition_terms)
+CONDITION_TERM_EXPANSIONS = (
+    ('headache', 'headache pain head ache migraine tension analgesic'),
+    ('pain', 'pain ache sore hurt discomfort analgesic painkiller'),
+    ('fever', 'fever temperature pyrexia hot antipyretic'),
+    ('infection', 'infection bacterial viral microbial antibiotic'),
+    ('hypertension', 'hypertension high blood pressure bp antihypertensive'),
+    ('diabetes', 'diabetes diabetic sugar glucose antidiabetic'),
+    ('anxiety', 'anxiety anxious stress nervous anxiolytic'),
+    ('depression', 'depression depressed mood sad antidepressant'),
+    ('nausea', 'nausea nauseous sick vomiting antiemetic'),
+    ('dizziness', 'dizziness dizzy vertigo antivertigo'),
+    ('fatigue', 'fatigue tired exhaustion weak stimulant'),
+    ('inflammation', 'inflammation inflammatory swelling anti-inflammatory'),
+    ('cough', 'cough coughing throat respiratory antitussive'),
+    ('cold', 'cold flu influenza respiratory decongestant'),
+    ('allergy', 'allergy allergic reaction hypersensitivity antihistamine'),
+)
+
+# Condition keyword -> related phrases, for sentence-embedding queries
+SEMANTIC_CONDITION_TERMS = (
+    ('headache', 'migraine tension headache cluster headache pain relief analgesic'),
+    ('fever', 'pyrexia hyperthermia antipyretic temperature fever reducer'),
+    ('pain', 'analgesia pain management chronic pain acute pain analgesic painkiller'),
+    ('infection', 'bacterial infection viral infection antimicrobial antibiotic antiviral'),
+    ('hypertension', 'high blood pressure cardiovascular antihypertensive blood pressure'),
+    ('diabetes', 'diabetic blood sugar glucose insulin antidiabetic'),
+    ('anxiety', 'anxiolytic panic disorder stress mental health anxiety'),
+    ('depression', 'antidepressant mood disorder mental health SSRI depression'),
+    ('asthma', 'respiratory bronchodilator breathing lung asthma'),
+    ('allergy', 'antihistamine allergic reaction hypersensitivity allergy'),
+    ('nausea', 'nausea vomiting antiemetic stomach'),
+    ('cough', 'cough coughing antitussive respiratory'),
+    ('inflammation', 'inflammation anti-inflammatory swelling inflammatory'),
+)
+
+# Condition keyword -> specific terms and drug names, for keyword matching without embeddings
+KEYWORD_CONDITION_TERMS = (
+    ('headache', 'migraine tension cluster pain analgesic acetaminophen ibuprofen aspirin'),
+    ('fever', 'fever temperature pyrexia antipyretic acetaminophen ibuprofen'),
+    ('pain', 'pain ache analgesic acetaminophen ibuprofen morphine tramadol'),
+    ('infection', 'infection bacterial viral antibiotic antimicrobial amoxicillin penicillin'),
+    ('hypertension', 'hypertension blood pressure cardiovascular antihypertensive amlodipine lisinopril'),
+    ('diabetes', 'diabetes diabetic glucose insulin metformin antidiabetic'),
+    ('anxiety', 'anxiety anxiolytic stress alprazolam lorazepam diazepam'),
+    ('depression', 'depression antidepressant mood fluoxetine sertraline citalopram'),
+    ('asthma', 'asthma respiratory bronchodilator albuterol inhaler breathing'),
+    ('allergy', 'allergy antihistamine allergic diphenhydramine loratadine cetirizine'),
+    ('nausea', 'nausea vomiting antiemetic ondansetron metoclopramide'),
+    ('cough', 'cough antitussive dextromethorphan codeine respiratory'),
+    ('inflammation', 'inflammation anti-inflammatory ibuprofen naproxen corticosteroid'),
+)
+
+
 class AISuggestionService:
     def __init__(self):
         self.condition_model = None
         self.drug_embeddings = None
         self.patient_embeddings = None
         self.vectorizer = None
+        # (catalog version, fitted vectorizer, drug ids, drug vectors), rebuilt when the catalog changes
+        self._drug_tfidf = None
+        # (catalog version, drug ids, normalized drug embeddings), rebuilt when the catalog changes
+        self._drug_semantic_embeddings = None
+        # (catalog version, word -> column, drug ids, binary drug x word matrix), rebuilt when the catalog changes
+        self._drug_keywords = None
+        # (catalog version, per-drug lowered text fields), rebuilt when the catalog changes
+        self._drug_keyword_texts = None
         self.scaler = StandardScaler()
         self._model_initialized = False
         self._initialize_models()
@@ -50,12 +195,9 @@ class AISuggestionService:
         """Initialize AI models and embeddings"""
         try:
             # Initialize sentence transformer for semantic similarity (if available)
-            if SENTENCE_TRANSFORMERS_AVAILABLE:
+            if sentence_model_available():
                 try:
-                    # Use a more robust loading approach with device specification
-                    import torch
-                    device = 'cpu'  # Force CPU to avoid GPU issues
-                    self.condition_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)
+                    self.condition_model = get_sentence_model()
                     logger.info("Sentence transformer model loaded successfully")
                 except Exception as e:
                     logger.warning(f"Could not load sentence transformer: {e}")
@@ -68,7 +210,8 @@ class AISuggestionService:
             self.vectorizer = TfidfVectorizer(
                 max_features=1000,
                 stop_words='english',
-                ngram_range=(1, 2)
+                ngram_range=(1, 2),
+                dtype=np.float32  # Half the memory of the default float64 for the cached drug vectors
             )
             
             # Download required NLTK data
@@ -94,29 +237,10 @@ class AISuggestionService:
         """Expand condition with synonyms and related medical terms"""
         condition_lower = condition.lower()
         
-        # Medical term mappings
-        term_mappings = {
-            'headache': 'headache pain head ache migraine tension analgesic',
-            'pain': 'pain ache sore hurt discomfort analgesic painkiller',
-            'fever': 'fever temperature pyrexia hot antipyretic',
-            'infection': 'infection bacterial viral microbial antibiotic',
-            'hypertension': 'hypertension high blood pressure bp antihypertensive',
-            'diabetes': 'diabetes diabetic sugar glucose antidiabetic',
-            'anxiety': 'anxiety anxious stress nervous anxiolytic',
-            'depression': 'depression depressed mood sad antidepressant',
-            'nausea': 'nausea nauseous sick vomiting antiemetic',
-            'dizziness': 'dizziness dizzy vertigo antivertigo',
-            'fatigue': 'fatigue tired exhaustion weak stimulant',
-            'inflammation': 'inflammation inflammatory swelling anti-inflammatory',
-            'cough': 'cough coughing throat respiratory antitussive',
-            'cold': 'cold flu influenza respiratory decongestant',
-            'allergy': 'allergy allergic reaction hypersensitivity antihistamine'
-        }
-        
         expanded_terms = [condition]
         
         # Add related terms
-        for key, terms in term_mappings.items():
+        for key, terms in CONDITION_TERM_EXPANSIONS:
             if key in condition_lower:
                 expanded_terms.extend(terms.split())
         
@@ -167,12 +291,55 @@ class AISuggestionService:
         use_dosage_optimization: bool = True
     ) -> List[Dict]:
         """
-        Get AI-enhanced medication suggestions with multiple ML approaches
+        Get AI-enhanced medication suggestions with multiple ML approaches.
+        With a shared cache, repeated requests are served from it until something the suggestions read changes
         """
+        excluded_drugs = excluded_drugs or []
+        if not suggestions_cache_enabled():
+            return self._build_ai_enhanced_suggestions(
+                patient_id, condition, excluded_drugs, max_suggestions, use_patient_similarity, use_dosage_optimization
+            )
+        condition_hash = hashlib.md5(condition.encode(), usedforsecurity=False).hexdigest()
+        key = (
+            f"drugs:suggestions:{suggestions_version()}:{patient_id}:{condition_hash}:"
+            f"{','.join(sorted(map(str, excluded_drugs)))}:{max_suggestions}:"
+            f"{int(bool(use_patient_similarity))}{int(bool(use_dosage_optimization))}"
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            # Stored with drug ids in place of the Drug instances
+            drugs_by_id = Drug.objects.in_bulk([suggestion['drug'] for suggestion in cached])
+            return [
+                {**suggestion, 'drug': drugs_by_id[suggestion['drug']]}
+                for suggestion in cached if suggestion['drug'] in drugs_by_id
+            ]
+        
+        suggestions = self._build_ai_enhanced_suggestions(
+            patient_id, condition, excluded_drugs, max_suggestions, use_patient_similarity, use_dosage_optimization
+        )
+        # An empty list is also what a failed run returns, so only real results are kept
+        if suggestions:
+            cache.set(
+                key,
+                [{**suggestion, 'drug': suggestion['drug'].id} for suggestion in suggestions],
+                SUGGESTIONS_CACHE_TIMEOUT
+            )
+        return suggestions
+    
+    def _build_ai_enhanced_suggestions(
+        self, 
+        patient_id: int, 
+        condition: str, 
+        excluded_drugs: List[int],
+        max_suggestions: int,
+        use_patient_similarity: bool,
+        use_dosage_optimization: bool
+    ) -> List[Dict]:
+        """get_ai_enhanced_suggestions without the cache"""
         try:
             logger.info(f"🚀 STARTING AI-ENHANCED SUGGESTIONS for Patient {patient_id}, Condition: '{condition}'")
-            patient = Patient.objects.get(id=patient_id)
-            excluded_drugs = excluded_drugs or []
+            # Every method checks the patient's allergies; load them (and their names) once
+            patient = Patient.objects.prefetch_related('patient_allergies__allergy').get(id=patient_id)
             
             # Get base suggestions using multiple AI approaches
             suggestions = []
@@ -253,9 +420,7 @@ class AISuggestionService:
         try:
             # Get basic available drugs
             drugs = Drug.objects.filter(availability='available').exclude(
-                id__in=excluded_drugs
-            ).exclude(
-                allergy_conflicts__in=patient.patient_allergies.values_list('allergy', flat=True)
+                id__in=self._blocked_drug_ids(patient, excluded_drugs)
             )[:max_suggestions]
             
             suggestions = []
@@ -273,6 +438,105 @@ class AISuggestionService:
             logger.error(f"Error in fallback suggestions: {e}")
             return []
     
+    def _get_drug_keywords(self):
+        """Which words appear in each available drug's keyword text, built once per drug catalog version.
+        Returns (vocabulary, drug ids, matrix): a binary sparse matrix with a row per drug in the order of
+        the ids and a column per word, so a drug's overlap with some words is its row summed over their columns"""
+        version = drug_catalog_version()
+        if self._drug_keywords is None or self._drug_keywords[0] != version:
+            drugs = Drug.objects.filter(availability='available').values_list(
+                'id', 'name', 'generic_name', 'category', 'therapeutic_class', 'dosage_instructions'
+            )
+            drug_ids = []
+            drug_texts = []
+            for drug_id, name, generic_name, category, therapeutic_class, dosage_instructions in drugs:
+                drug_ids.append(drug_id)
+                drug_texts.append(f"{name} {generic_name} {category} {therapeutic_class or ''} {dosage_instructions or ''}")
+            
+            vocabulary = {}
+            drug_words = None
+            if drug_texts:
+                # The same words _keyword_based_filtering matches on: lowercased and split on whitespace
+                counter = CountVectorizer(binary=True, tokenizer=str.split, token_pattern=None)
+                drug_words = counter.fit_transform(drug_texts).tocsc()
+                vocabulary = counter.vocabulary_
+            self._drug_keywords = (version, vocabulary, np.array(drug_ids), drug_words)
+        return self._drug_keywords[1:]
+    
+    def _keyword_overlap_filtering(self, condition_expanded: str, blocked_ids: List[int], max_suggestions: int) -> List[Dict]:
+        """_keyword_based_filtering over every available drug outside blocked_ids, with the
+        overlaps counted as one sparse column sum instead of a set intersection per drug"""
+        condition_words = set(condition_expanded.lower().split())
+        vocabulary, drug_ids, drug_words = self._get_drug_keywords()
+        columns = [vocabulary[word] for word in condition_words if word in vocabulary]
+        if drug_words is None or not columns:
+            return []
+        
+        overlaps = np.asarray(drug_words[:, columns].sum(axis=1)).ravel()
+        overlaps[np.isin(drug_ids, blocked_ids)] = 0
+        
+        # Stable, so equal scores keep catalog order as the per-drug loop did
+        top = [idx for idx in np.argsort(-overlaps, kind='stable')[:max_suggestions] if overlaps[idx] > 0]
+        drugs_by_id = Drug.objects.in_bulk(drug_ids[top].tolist())
+        
+        suggestions = []
+        for idx in top:
+            drug = drugs_by_id.get(drug_ids[idx])
+            if drug is None:  # Deleted since the matrix was built
+                continue
+            overlap = int(overlaps[idx])
+            suggestions.append({
+                'drug': drug,
+                'similarity_score': overlap / len(condition_words),
+                'method': 'keyword_matching',
+                'reasoning': f"Keyword match with {overlap} common terms"
+            })
+        return suggestions
+    
+    def _get_drug_tfidf(self):
+        """TF-IDF vectors of every available drug, fitted once per drug catalog version rather than per request.
+        Returns (vectorizer, drug ids, drug vectors), with the vectors' rows in the order of the ids"""
+        version = drug_catalog_version()
+        if self._drug_tfidf is None or self._drug_tfidf[0] != version:
+            drugs = Drug.objects.filter(availability='available').values_list(
+                'id', 'name', 'generic_name', 'category', 'therapeutic_class', 'dosage_instructions', 'side_effects'
+            )
+            drug_ids = []
+            drug_descriptions = []
+            for drug_id, name, generic_name, category, therapeutic_class, dosage_instructions, side_effects in drugs:
+                # Create weighted text that heavily emphasizes the category field
+                drug_category = category.replace('-', ' ').replace('_', ' ')  # Normalize category
+                
+                # Repeat category multiple times to give it maximum weight in TF-IDF analysis
+                weighted_text = f"{drug_category} {drug_category} {drug_category} {drug_category} {name} {generic_name} {therapeutic_class or ''} {dosage_instructions or ''} {side_effects or ''}"
+                
+                drug_ids.append(drug_id)
+                drug_descriptions.append(weighted_text)
+            
+            # Fit a fresh copy so requests still using the previous version keep a consistent vocabulary
+            vectorizer = clone(self.vectorizer)
+            drug_vectors = vectorizer.fit_transform(drug_descriptions) if drug_descriptions else None
+            self._drug_tfidf = (version, vectorizer, np.array(drug_ids), drug_vectors)
+        return self._drug_tfidf[1:]
+    
+    def _patient_allergy_ids(self, patient: Patient) -> Set[int]:
+        """Allergy ids of the patient, read from patient_allergies (prefetched by get_ai_enhanced_suggestions)"""
+        return {patient_allergy.allergy_id for patient_allergy in patient.patient_allergies.all()}
+    
+    def _conflicting_drug_ids(self, patient: Patient) -> Set[int]:
+        """Ids of drugs conflicting with the patient's allergies, read live once per patient instance (one request).
+        Never cached across requests: a per-process cache can miss another worker's writes and suggest an allergen"""
+        if not hasattr(patient, '_conflicting_drug_ids'):
+            allergy_ids = self._patient_allergy_ids(patient)
+            patient._conflicting_drug_ids = set(Drug.allergy_conflicts.through.objects.filter(
+                allergy_id__in=allergy_ids
+            ).values_list('drug_id', flat=True)) if allergy_ids else set()
+        return patient._conflicting_drug_ids
+    
+    def _blocked_drug_ids(self, patient: Patient, excluded_drugs: List[int]) -> List[int]:
+        """Ids of the excluded drugs and of drugs conflicting with the patient's allergies"""
+        return list(self._conflicting_drug_ids(patient).union(excluded_drugs))
+    
     def _content_based_filtering(
         self, 
         condition: str, 
@@ -282,60 +546,43 @@ class AISuggestionService:
     ) -> List[Dict]:
         """Content-based filtering using drug descriptions and therapeutic classes"""
         try:
-            # Get all available drugs
-            drugs = Drug.objects.filter(availability='available').exclude(
-                id__in=excluded_drugs
-            ).exclude(
-                allergy_conflicts__in=patient.patient_allergies.values_list('allergy', flat=True)
-            )
-            
-            if not drugs.exists():
-                return []
-            
-            # Create drug descriptions for TF-IDF with expanded terms
-            drug_descriptions = []
-            drug_data = []
-            
-            # Expand condition with synonyms and related terms
-            condition_expanded = self._expand_condition_terms(condition)
-            
-            for drug in drugs:
-                # Create weighted text that heavily emphasizes the category field
-                drug_category = drug.category.replace('-', ' ').replace('_', ' ')  # Normalize category
+            if self.vectorizer:
+                vectorizer, drug_ids, drug_vectors = self._get_drug_tfidf()
+                if drug_vectors is None:
+                    return []
                 
-                # Repeat category multiple times to give it maximum weight in TF-IDF analysis
-                weighted_text = f"{drug_category} {drug_category} {drug_category} {drug_category} {drug.name} {drug.generic_name} {drug.therapeutic_class or ''} {drug.dosage_instructions or ''} {drug.side_effects or ''}"
+                # Expand condition with synonyms and related terms
+                condition_expanded = self._expand_condition_terms(condition)
+                condition_vector = vectorizer.transform([condition_expanded])
                 
-                drug_descriptions.append(weighted_text)
-                drug_data.append(drug)
-            
-            # Vectorize drug descriptions
-            if self.vectorizer:
-                drug_vectors = self.vectorizer.fit_transform(drug_descriptions)
-                condition_vector = self.vectorizer.transform([condition_expanded])
+                # TF-IDF rows and the query are already L2-normalized, so the dot product is their cosine similarity
+                similarities = (drug_vectors @ condition_vector.T).toarray().ravel()
                 
-                # Calculate similarities
-                similarities = cosine_similarity(condition_vector, drug_vectors).flatten()
+                # Excluded drugs and the patient's allergy conflicts never rank
+                blocked_ids = self._blocked_drug_ids(patient, excluded_drugs)
+                similarities[np.isin(drug_ids, blocked_ids)] = 0
                 
                 # Get top suggestions
-                top_indices = np.argsort(similarities)[::-1][:max_suggestions]
+                top = [idx for idx in top_indices(similarities, max_suggestions) if similarities[idx] > 0.01]  # Lower similarity threshold
+                drugs_by_id = Drug.objects.in_bulk(drug_ids[top].tolist())
                 
                 suggestions = []
-                for idx in top_indices:
-                    if similarities[idx] > 0.01:  # Lower similarity threshold
-                        drug = drug_data[idx]
-                        # Add condition-specific reasoning
-                        reasoning = self._get_condition_specific_reasoning(condition, drug)
-                        suggestions.append({
-                            'drug': drug,
-                            'similarity_score': float(similarities[idx]),
-                            'method': 'content_based',
-                            'reasoning': reasoning
-                        })
+                for idx in top:
+                    drug = drugs_by_id.get(drug_ids[idx])
+                    if drug is None:  # Deleted since the vectors were fitted
+                        continue
+                    # Add condition-specific reasoning
+                    reasoning = self._get_condition_specific_reasoning(condition, drug)
+                    suggestions.append({
+                        'drug': drug,
+                        'similarity_score': float(similarities[idx]),
+                        'method': 'content_based',
+                        'reasoning': reasoning
+                    })
                 
                 # If no suggestions found with TF-IDF, try keyword matching
                 if not suggestions:
-                    suggestions = self._keyword_based_filtering(condition_expanded, drug_data, max_suggestions)
+                    suggestions = self._keyword_overlap_filtering(condition_expanded, blocked_ids, max_suggestions)
                 
                 return suggestions
             
@@ -433,36 +680,34 @@ class AISuggestionService:
             # Get drugs prescribed to similar patients for similar conditions
             similar_patient_ids = [p.id for p in similar_patients]
             
-            prescriptions = Prescription.objects.filter(
-                patient_id__in=similar_patient_ids,
-                status__in=['active', 'completed']
-            ).select_related('patient').prefetch_related('medications')
-            
-            # Count drug frequency for similar patients
-            drug_frequency = {}
-            for prescription in prescriptions:
-                for medication in prescription.medications.all():
-                    drug_id = medication.id
-                    if drug_id not in excluded_drugs:
-                        drug_frequency[drug_id] = drug_frequency.get(drug_id, 0) + 1
-            
-            # Get top drugs and create suggestions
-            top_drugs = sorted(drug_frequency.items(), key=lambda x: x[1], reverse=True)[:max_suggestions]
+            # Count how often each drug was prescribed to them in the database and keep the most frequent;
+            # ties go to the most recently prescribed
+            top_drugs = list(PrescriptionMedication.objects.filter(
+                prescription__patient_id__in=similar_patient_ids,
+                prescription__status__in=['active', 'completed']
+            ).exclude(
+                drug_id__in=excluded_drugs
+            ).values('drug_id').annotate(
+                frequency=Count('id'), last_prescribed=Max('prescription__prescribed_date')
+            ).order_by('-frequency', '-last_prescribed', 'drug__name').values_list('drug_id', 'frequency')[:max_suggestions])
+            
+            # Load the top drugs that are available and don't conflict with the patient's allergies in one query
+            drugs_by_id = Drug.objects.filter(
+                id__in=[drug_id for drug_id, _ in top_drugs], availability='available'
+            ).exclude(
+                id__in=self._blocked_drug_ids(patient, [])
+            ).in_bulk()
             
             suggestions = []
             for drug_id, frequency in top_drugs:
-                try:
-                    drug = Drug.objects.get(id=drug_id, availability='available')
-                    # Check allergy conflicts
-                    if not drug.allergy_conflicts.filter(id__in=patient.patient_allergies.values_list('allergy', flat=True)).exists():
-                        suggestions.append({
-                            'drug': drug,
-                            'similarity_score': frequency / len(similar_patients),
-                            'method': 'collaborative',
-                            'reasoning': f"Prescribed to {frequency} similar patients"
-                        })
-                except Drug.DoesNotExist:
-                    continue
+                drug = drugs_by_id.get(drug_id)
+                if drug is not None:
+                    suggestions.append({
+                        'drug': drug,
+                        'similarity_score': frequency / len(similar_patients),
+                        'method': 'collaborative',
+                        'reasoning': f"Prescribed to {frequency} similar patients"
+                    })
             
             return suggestions
             
@@ -471,6 +716,61 @@ class AISuggestionService:
         
         return []
     
+    def _get_drug_embeddings(self):
+        """Sentence embeddings of every available drug with a therapeutic class, encoded once per drug
+        catalog version rather than per request. Returns (drug ids, embeddings), unit-normalized float32
+        rows in the order of the ids, so a dot product with a normalized query is its cosine similarity"""
+        version = drug_catalog_version()
+        if self._drug_semantic_embeddings is None or self._drug_semantic_embeddings[0] != version:
+            drugs = Drug.objects.filter(availability='available', therapeutic_class__isnull=False).values_list(
+                'id', 'name', 'generic_name', 'category', 'therapeutic_class', 'dosage_instructions'
+            )
+            drug_ids = []
+            drug_texts = []
+            for drug_id, name, generic_name, category, therapeutic_class, dosage_instructions in drugs:
+                # Create weighted text that heavily emphasizes the category field for semantic analysis
+                drug_category = category.replace('-', ' ').replace('_', ' ')  # Normalize category
+                
+                # Repeat category multiple times to give it maximum weight in semantic analysis
+                weighted_drug_text = f"{drug_category} {drug_category} {drug_category} {name} {generic_name} {therapeutic_class} {dosage_instructions or ''}"
+                
+                drug_ids.append(drug_id)
+                drug_texts.append(weighted_drug_text)
+            
+            embeddings = self._load_or_encode_drug_embeddings(drug_ids, drug_texts) if drug_texts else None
+            self._drug_semantic_embeddings = (version, np.array(drug_ids), embeddings)
+        return self._drug_semantic_embeddings[1:]
+    
+    def _load_or_encode_drug_embeddings(self, drug_ids: List[int], drug_texts: List[str]) -> np.ndarray:
+        """Encode the drug texts, or memory-map the embeddings a process already saved to settings.AI_CACHE_DIR
+        for the same encoder and texts; worker processes then share the file's pages instead of re-encoding"""
+        digest = hashlib.sha256(f"{SENTENCE_MODEL_NAME}\0{type(self.condition_model).__name__}".encode())
+        for drug_id, drug_text in zip(drug_ids, drug_texts):
+            digest.update(f"\0{drug_id}\0{drug_text}".encode())
+        path = os.path.join(settings.AI_CACHE_DIR, f"drug_embeddings_{digest.hexdigest()[:32]}.npy")
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+        
+        embeddings = self.condition_model.encode(
+            drug_texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+        try:
+            os.makedirs(settings.AI_CACHE_DIR, exist_ok=True)
+            # Written aside and renamed, so other processes never map a partial file
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as temp_file:
+                np.save(temp_file, embeddings)
+            os.replace(temp_path, path)
+            # Earlier catalogs' files; processes still mapping one keep it until they let go
+            for name in os.listdir(settings.AI_CACHE_DIR):
+                if name.startswith('drug_embeddings_') and name.endswith('.npy') and name != os.path.basename(path):
+                    os.remove(os.path.join(settings.AI_CACHE_DIR, name))
+        except OSError as e:
+            logger.warning(f"Could not save drug embeddings to {settings.AI_CACHE_DIR}: {e}")
+        return embeddings
+    
     def _semantic_similarity_filtering(
         self, 
         condition: str, 
@@ -487,73 +787,44 @@ class AISuggestionService:
             
             logger.info(f"🧠 USING SEMANTIC SIMILARITY MODEL for condition: '{condition}'")
             
-            # Get drugs with therapeutic classes
-            drugs = Drug.objects.filter(
-                availability='available',
-                therapeutic_class__isnull=False
-            ).exclude(id__in=excluded_drugs).exclude(
-                allergy_conflicts__in=patient.patient_allergies.values_list('allergy', flat=True)
-            )
-            
-            if not drugs.exists():
+            # Available drugs with therapeutic classes
+            drug_ids, drug_embeddings = self._get_drug_embeddings()
+            if drug_embeddings is None:
                 return []
             
-            # Create condition-disease mappings for semantic matching
-            condition_mappings = {
-                'headache': ['migraine', 'tension headache', 'cluster headache', 'pain relief', 'analgesic'],
-                'fever': ['pyrexia', 'hyperthermia', 'antipyretic', 'temperature', 'fever reducer'],
-                'pain': ['analgesia', 'pain management', 'chronic pain', 'acute pain', 'analgesic', 'painkiller'],
-                'infection': ['bacterial infection', 'viral infection', 'antimicrobial', 'antibiotic', 'antiviral'],
-                'hypertension': ['high blood pressure', 'cardiovascular', 'antihypertensive', 'blood pressure'],
-                'diabetes': ['diabetic', 'blood sugar', 'glucose', 'insulin', 'antidiabetic'],
-                'anxiety': ['anxiolytic', 'panic disorder', 'stress', 'mental health', 'anxiety'],
-                'depression': ['antidepressant', 'mood disorder', 'mental health', 'SSRI', 'depression'],
-                'asthma': ['respiratory', 'bronchodilator', 'breathing', 'lung', 'asthma'],
-                'allergy': ['antihistamine', 'allergic reaction', 'hypersensitivity', 'allergy'],
-                'nausea': ['nausea', 'vomiting', 'antiemetic', 'stomach'],
-                'cough': ['cough', 'coughing', 'antitussive', 'respiratory'],
-                'inflammation': ['inflammation', 'anti-inflammatory', 'swelling', 'inflammatory']
-            }
-            
             # Expand condition with related terms
-            expanded_condition = condition.lower()
-            for key, terms in condition_mappings.items():
-                if key in condition.lower():
-                    expanded_condition += " " + " ".join(terms)
+            condition_lower = condition.lower()
+            expanded_condition = condition_lower
+            for key, terms in SEMANTIC_CONDITION_TERMS:
+                if key in condition_lower:
+                    expanded_condition += " " + terms
             
-            # Calculate semantic similarities
-            condition_embedding = self.condition_model.encode([expanded_condition])
-            drug_embeddings = []
-            drug_list = []
+            # Calculate semantic similarities; the query is the only text encoded per request
+            condition_embedding = self.condition_model.encode(
+                [expanded_condition], convert_to_numpy=True, normalize_embeddings=True
+            )[0].astype(np.float32, copy=False)
+            similarities = drug_embeddings @ condition_embedding
             
-            for drug in drugs:
-                # Create weighted text that heavily emphasizes the category field for semantic analysis
-                drug_category = drug.category.replace('-', ' ').replace('_', ' ')  # Normalize category
-                
-                # Repeat category multiple times to give it maximum weight in semantic analysis
-                weighted_drug_text = f"{drug_category} {drug_category} {drug_category} {drug.name} {drug.generic_name} {drug.therapeutic_class} {drug.dosage_instructions or ''}"
-                
-                drug_embeddings.append(weighted_drug_text)
-                drug_list.append(drug)
+            # Excluded drugs and the patient's allergy conflicts never rank
+            similarities[np.isin(drug_ids, self._blocked_drug_ids(patient, excluded_drugs))] = 0
             
-            if drug_embeddings:
-                drug_embeddings = self.condition_model.encode(drug_embeddings)
-                similarities = cosine_similarity(condition_embedding, drug_embeddings).flatten()
-                
-                # Get top suggestions
-                top_indices = np.argsort(similarities)[::-1][:max_suggestions]
-                
-                suggestions = []
-                for idx in top_indices:
-                    if similarities[idx] > 0.2:  # Lower threshold for semantic similarity
-                        suggestions.append({
-                            'drug': drug_list[idx],
-                            'similarity_score': float(similarities[idx]),
-                            'method': 'semantic',
-                            'reasoning': f"Semantically similar to condition: {condition}"
-                        })
-                
-                return suggestions
+            # Get top suggestions
+            top = [idx for idx in top_indices(similarities, max_suggestions) if similarities[idx] > 0.2]  # Lower threshold for semantic similarity
+            drugs_by_id = Drug.objects.in_bulk(drug_ids[top].tolist())
+            
+            suggestions = []
+            for idx in top:
+                drug = drugs_by_id.get(drug_ids[idx])
+                if drug is None:  # Deleted since the embeddings were encoded
+                    continue
+                suggestions.append({
+                    'drug': drug,
+                    'similarity_score': float(similarities[idx]),
+                    'method': 'semantic',
+                    'reasoning': f"Semantically similar to condition: {condition}"
+                })
+            
+            return suggestions
             
         except Exception as e:
             logger.error(f"Error in semantic similarity filtering: {e}")
@@ -562,6 +833,25 @@ class AISuggestionService:
         
         return []
     
+    def _get_drug_keyword_texts(self):
+        """Lowered text of every available drug for _enhanced_keyword_semantic_filtering, built once per drug
+        catalog version. Returns (drug id, words, category, name, therapeutic class) tuples in catalog order"""
+        version = drug_catalog_version()
+        if self._drug_keyword_texts is None or self._drug_keyword_texts[0] != version:
+            drugs = Drug.objects.filter(availability='available').values_list(
+                'id', 'name', 'generic_name', 'category', 'therapeutic_class', 'dosage_instructions'
+            )
+            rows = []
+            for drug_id, name, generic_name, category, therapeutic_class, dosage_instructions in drugs:
+                # The category is weighted by repetition elsewhere; as a set of words one copy is enough
+                drug_category = category.replace('-', ' ').replace('_', ' ')  # Normalize category
+                drug_text = f"{drug_category} {name} {generic_name} {therapeutic_class or ''} {dosage_instructions or ''}".lower()
+                rows.append((
+                    drug_id, frozenset(drug_text.split()), category.lower(), name.lower(), (therapeutic_class or '').lower()
+                ))
+            self._drug_keyword_texts = (version, rows)
+        return self._drug_keyword_texts[1]
+    
     def _enhanced_keyword_semantic_filtering(
         self, 
         condition: str, 
@@ -571,49 +861,22 @@ class AISuggestionService:
     ) -> List[Dict]:
         """Enhanced keyword-based semantic filtering when sentence transformers unavailable"""
         try:
-            # Get all available drugs
-            drugs = Drug.objects.filter(availability='available').exclude(
-                id__in=excluded_drugs
-            ).exclude(
-                allergy_conflicts__in=patient.patient_allergies.values_list('allergy', flat=True)
-            )
-            
-            if not drugs.exists():
-                return []
-            
-            # Enhanced condition-disease mappings with more specific terms
-            condition_mappings = {
-                'headache': ['migraine', 'tension', 'cluster', 'pain', 'analgesic', 'acetaminophen', 'ibuprofen', 'aspirin'],
-                'fever': ['fever', 'temperature', 'pyrexia', 'antipyretic', 'acetaminophen', 'ibuprofen'],
-                'pain': ['pain', 'ache', 'analgesic', 'acetaminophen', 'ibuprofen', 'morphine', 'tramadol'],
-                'infection': ['infection', 'bacterial', 'viral', 'antibiotic', 'antimicrobial', 'amoxicillin', 'penicillin'],
-                'hypertension': ['hypertension', 'blood pressure', 'cardiovascular', 'antihypertensive', 'amlodipine', 'lisinopril'],
-                'diabetes': ['diabetes', 'diabetic', 'glucose', 'insulin', 'metformin', 'antidiabetic'],
-                'anxiety': ['anxiety', 'anxiolytic', 'stress', 'alprazolam', 'lorazepam', 'diazepam'],
-                'depression': ['depression', 'antidepressant', 'mood', 'fluoxetine', 'sertraline', 'citalopram'],
-                'asthma': ['asthma', 'respiratory', 'bronchodilator', 'albuterol', 'inhaler', 'breathing'],
-                'allergy': ['allergy', 'antihistamine', 'allergic', 'diphenhydramine', 'loratadine', 'cetirizine'],
-                'nausea': ['nausea', 'vomiting', 'antiemetic', 'ondansetron', 'metoclopramide'],
-                'cough': ['cough', 'antitussive', 'dextromethorphan', 'codeine', 'respiratory'],
-                'inflammation': ['inflammation', 'anti-inflammatory', 'ibuprofen', 'naproxen', 'corticosteroid']
-            }
+            # Score the cached drug texts; only the drugs that make the cut are loaded as models
+            blocked_ids = set(self._blocked_drug_ids(patient, excluded_drugs))
             
             # Expand condition with related terms
-            expanded_condition = condition.lower()
-            for key, terms in condition_mappings.items():
-                if key in condition.lower():
-                    expanded_condition += " " + " ".join(terms)
+            condition_lower = condition.lower()
+            expanded_condition = condition_lower
+            for key, terms in KEYWORD_CONDITION_TERMS:
+                if key in condition_lower:
+                    expanded_condition += " " + terms
             
-            suggestions = []
+            scores = []
             condition_words = set(expanded_condition.split())
             
-            for drug in drugs:
-                # Create weighted drug text that heavily emphasizes the category field
-                drug_category = drug.category.replace('-', ' ').replace('_', ' ')  # Normalize category
-                
-                # Repeat category multiple times to give it maximum weight in keyword matching
-                weighted_drug_text = f"{drug_category} {drug_category} {drug_category} {drug_category} {drug.name} {drug.generic_name} {drug.therapeutic_class or ''} {drug.dosage_instructions or ''}".lower()
-                drug_words = set(weighted_drug_text.split())
+            for drug_id, drug_words, category, name, therapeutic_class in self._get_drug_keyword_texts():
+                if drug_id in blocked_ids:
+                    continue
                 
                 # Calculate enhanced similarity
                 word_overlap = len(condition_words.intersection(drug_words))
@@ -622,27 +885,33 @@ class AISuggestionService:
                     base_score = word_overlap / len(condition_words)
                     
                     # MASSIVE boost score for category matches (most important)
-                    if any(word in drug.category.lower() for word in condition_words):
+                    if any(word in category for word in condition_words):
                         base_score *= 3.0  # Triple the score for category matches
                     
                     # Boost score for exact matches in drug names
-                    if any(word in drug.name.lower() for word in condition_words):
+                    if any(word in name for word in condition_words):
                         base_score *= 1.5
                     
                     # Boost score for therapeutic class matches
-                    if drug.therapeutic_class and any(word in drug.therapeutic_class.lower() for word in condition_words):
+                    if therapeutic_class and any(word in therapeutic_class for word in condition_words):
                         base_score *= 1.3
                     
-                    suggestions.append({
-                        'drug': drug,
-                        'similarity_score': min(1.0, base_score),
-                        'method': 'semantic_keyword',
-                        'reasoning': f"Enhanced keyword match for condition: {condition}"
-                    })
-            
-            # Sort by score and return top suggestions
-            suggestions.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return suggestions[:max_suggestions]
+                    scores.append((drug_id, min(1.0, base_score)))
+            
+            # Sort by score and load the top suggestions
+            scores.sort(key=lambda x: x[1], reverse=True)
+            scores = scores[:max_suggestions]
+            drugs_by_id = Drug.objects.in_bulk([drug_id for drug_id, _ in scores])
+            
+            return [
+                {
+                    'drug': drugs_by_id[drug_id],
+                    'similarity_score': score,
+                    'method': 'semantic_keyword',
+                    'reasoning': f"Enhanced keyword match for condition: {condition}"
+                }
+                for drug_id, score in scores if drug_id in drugs_by_id
+            ]
             
         except Exception as e:
             logger.error(f"Error in enhanced keyword semantic filtering: {e}")
@@ -659,14 +928,21 @@ class AISuggestionService:
         try:
             # Get all available drugs
             drugs = Drug.objects.filter(availability='available').exclude(
-                id__in=excluded_drugs
-            ).exclude(
-                allergy_conflicts__in=patient.patient_allergies.values_list('allergy', flat=True)
+                id__in=self._blocked_drug_ids(patient, excluded_drugs)
             )
             
+            # Everything the per-drug safety score looks up is loaded live, once for the whole pass
+            allergy_conflicts = load_drug_allergy_conflicts()
+            base_interaction_risk, interaction_risks = self._assess_interaction_risks(
+                self._get_patient_current_medications(patient)
+            )
             suggestions = []
             for drug in drugs:
-                safety_score, reasoning_list = self._calculate_advanced_safety_score(drug, patient, condition)
+                safety_score, reasoning_list = self._calculate_advanced_safety_score(
+                    drug, patient, condition,
+                    drug_allergy_ids=allergy_conflicts.get(drug.id, frozenset()),
+                    interaction_risk=interaction_risks.get(drug.id, base_interaction_risk)
+                )
                 
                 # Apply condition relevance boost to safety score
                 condition_relevance = self._calculate_condition_relevance(drug, condition)
@@ -809,10 +1085,15 @@ class AISuggestionService:
         # Default to general if no specific match
         return 'general'
     
-    def _calculate_advanced_safety_score(self, drug: Drug, patient: Patient, condition: str) -> Tuple[float, List[str]]:
+    def _calculate_advanced_safety_score(
+        self, drug: Drug, patient: Patient, condition: str,
+        drug_allergy_ids: Optional[frozenset] = None, interaction_risk: Optional[float] = None
+    ) -> Tuple[float, List[str]]:
         """
         Calculate advanced safety score using multiplicative penalty system
         Returns score and detailed reasoning array
+        drug_allergy_ids defaults to the ids of the allergies the drug conflicts with,
+        interaction_risk to _assess_interaction_risk against the patient's current medications
         """
         base_score = 1.0  # Start with perfect score
         reasoning_parts = []
@@ -880,8 +1161,9 @@ class AISuggestionService:
                         reasoning_parts.append(f"⚠️ Contraindicated for {condition}")
         
         # Drug interaction risk (multiplicative)
-        current_medications = self._get_patient_current_medications(patient)
-        interaction_risk = self._assess_interaction_risk(drug, current_medications)
+        if interaction_risk is None:
+            current_medications = self._get_patient_current_medications(patient)
+            interaction_risk = self._assess_interaction_risk(drug, current_medications)
         
         if interaction_risk > 0.8:
             base_score *= 0.2  # 80% penalty for major interactions
@@ -913,11 +1195,13 @@ class AISuggestionService:
                 reasoning_parts.append("✅ Mild side effect profile")
         
         # Allergy conflicts (multiplicative)
-        patient_allergies = patient.patient_allergies.values_list('allergy__name', flat=True)
-        if drug.allergy_conflicts.exists():
-            conflicting_allergies = drug.allergy_conflicts.filter(
-                name__in=patient_allergies
-            ).values_list('name', flat=True)
+        if drug_allergy_ids is None:
+            drug_allergy_ids = frozenset(drug.allergy_conflicts.values_list('id', flat=True))
+        if drug_allergy_ids:
+            conflicting_allergies = [
+                patient_allergy.allergy.name for patient_allergy in patient.patient_allergies.all()
+                if patient_allergy.allergy_id in drug_allergy_ids
+            ]
             
             if conflicting_allergies:
                 base_score *= 0.1  # 90% penalty for allergy conflicts
@@ -951,7 +1235,15 @@ class AISuggestionService:
             similar_patients = Patient.objects.filter(
                 # Note: age filtering removed as Patient model doesn't have age field
                 gender=patient.gender
-            ).exclude(id=patient.id)
+            ).exclude(id=patient.id).annotate(
+                # Counted in the same query rather than two more per patient
+                allergy_count=Count('patient_allergies', distinct=True),
+                active_medication_count=Count(
+                    'prescriptions__prescription_medications',
+                    filter=Q(prescriptions__status='active'),
+                    distinct=True
+                ),
+            ).order_by('-created_at')  # Meta.ordering is not applied to aggregated querysets
             
             if not similar_patients.exists():
                 return []
@@ -964,8 +1256,8 @@ class AISuggestionService:
                 features = [
                     # Age calculation removed as Patient model doesn't have age field
                     1 if p.gender == 'M' else 0,
-                    len(p.patient_allergies.all()),
-                    len(self._get_patient_current_medications(p)),
+                    p.allergy_count,
+                    p.active_medication_count,
                     1 if p.medical_history else 0
                 ]
                 patient_features.append(features)
@@ -1053,6 +1345,36 @@ class AISuggestionService:
             logger.error(f"Error assessing interaction risk: {e}")
             return 0.5  # Default to moderate risk if error
     
+    def _assess_interaction_risks(self, current_medications: List[Drug]) -> Tuple[float, Dict[int, float]]:
+        """_assess_interaction_risk for every drug at once, from a single query.
+        Returns the risk of a drug in no interaction (that of the interactions among current_medications)
+        and a drug id -> risk mapping for the drugs that belong to an interaction"""
+        if not current_medications:
+            return 0.0, {}
+        
+        try:
+            severity_weights = {
+                'minor': 0.2,
+                'moderate': 0.5,
+                'major': 0.8,
+                'contraindicated': 1.0
+            }
+            
+            current_ids = {medication.id for medication in current_medications}
+            base_risk = 0.0
+            risks = {}
+            for drug_id, severity in Interaction.drugs.through.objects.values_list('drug_id', 'interaction__severity'):
+                risk = severity_weights.get(severity, 0.5)
+                risks[drug_id] = max(risks.get(drug_id, 0.0), risk)
+                if drug_id in current_ids:
+                    base_risk = max(base_risk, risk)
+            
+            return base_risk, {drug_id: max(risk, base_risk) for drug_id, risk in risks.items()}
+            
+        except Exception as e:
+            logger.error(f"Error assessing interaction risks: {e}")
+            return 0.5, {}  # Default to moderate risk if error
+    
     def _calculate_dynamic_weights(self, doctor_input: str, patient: Patient) -> Dict[str, float]:
         """
         Calculate dynamic weights based on context of doctor input and patient profile
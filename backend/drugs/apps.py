@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DrugsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drugs'
+
+    def ready(self):
+        # Connects the receivers that bump the drug catalog and suggestion cache versions
+        from drugs import caching  # noqa: F401
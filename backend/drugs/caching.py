@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from patients.models import Patient, PatientAllergy
+from rx.models import Prescription, PrescriptionMedication
+
+from .models import Drug, Interaction
+
+
+DRUG_CATALOG_VERSION_KEY = 'drugs:catalog_version'
+# Safety net for per-process caches (LocMemCache) that never see another process's signals
+DRUG_CATALOG_VERSION_TIMEOUT = 60 * 60
+
+
+def drug_catalog_version():
+    """Current version of the drug catalog; changes whenever a drug is saved or deleted"""
+    return cache.get_or_set(DRUG_CATALOG_VERSION_KEY, lambda: str(time.time()), DRUG_CATALOG_VERSION_TIMEOUT)
+
+
+@receiver(post_save, sender=Drug)
+@receiver(post_delete, sender=Drug)
+def invalidate_drug_catalog(**kwargs):
+    cache.set(DRUG_CATALOG_VERSION_KEY, str(time.time()), DRUG_CATALOG_VERSION_TIMEOUT)
+
+
+SUGGESTIONS_VERSION_KEY = 'drugs:suggestions_version'
+# Cached suggestions also expire on their own, for patient ages
+SUGGESTIONS_CACHE_TIMEOUT = 60 * 5
+
+
+def suggestions_cache_enabled():
+    """Suggestions are only cached in a shared cache (Redis). A per-process LocMemCache never sees the
+    allergy and interaction writes other workers make, and would keep serving suggestions that ignore them"""
+    return bool(settings.REDIS_URL)
+
+
+def suggestions_version():
+    """Current version of everything AI suggestions read; changes on any drug, allergy, interaction or prescription write"""
+    return cache.get_or_set(SUGGESTIONS_VERSION_KEY, lambda: str(time.time()), SUGGESTIONS_CACHE_TIMEOUT)
+
+
+# Collaborative filtering reads other patients' prescriptions, so any write invalidates every patient's suggestions
+@receiver(post_save, sender=Drug)
+@receiver(post_delete, sender=Drug)
+@receiver(m2m_changed, sender=Drug.allergy_conflicts.through)
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+@receiver(m2m_changed, sender=Interaction.drugs.through)
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+@receiver(post_save, sender=PatientAllergy)
+@receiver(post_delete, sender=PatientAllergy)
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=PrescriptionMedication)
+@receiver(post_delete, sender=PrescriptionMedication)
+def invalidate_suggestions(**kwargs):
+    cache.set(SUGGESTIONS_VERSION_KEY, str(time.time()), SUGGESTIONS_CACHE_TIMEOUT)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rx.models import Prescription
+
+
+class Command(BaseCommand):
+    help = 'Show the stored reason of a prescription'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'prescription_id',
+            type=int,
+            help='ID of the prescription to check'
+        )
+
+    def handle(self, *args, **options):
+        prescription_id = options['prescription_id']
+
+        # The raw column value in one query, without building a model instance
+        prescription = Prescription.objects.filter(id=prescription_id).values('id', 'reason').first()
+        if prescription is None:
+            raise CommandError(f'Prescription ID {prescription_id} not found')
+
+        self.stdout.write(f"Found Prescription ID: {prescription['id']}")
+        self.stdout.write(f"Reason field: '{prescription['reason']}'")
+        self.stdout.write(f"Reason type: {type(prescription['reason'])}")
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-15 06:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0007_interaction'),
+        ('patients', '0011_patient_blood_group_patient_height_patient_weight'),
+        ('rx', '0008_add_reason_field'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['prescriber', 'prescribed_date'], include=('status', 'patient'), name='rx_prescriber_date_ix'),
+        ),
+        migrations.AddIndex(
+            model_name='prescriptionmedication',
+            index=models.Index(fields=['prescription', 'drug'], name='rx_pm_prescription_drug_ix'),
+        ),
+    ]
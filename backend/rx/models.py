@@ -26,6 +26,15 @@ class Prescription(models.Model):
 
     class Meta:
         ordering = ['-prescribed_date']
+        indexes = [
+            # Every analytics view filters by prescriber and a prescribed_date range;
+            # status and patient are carried along for index-only scans (PostgreSQL)
+            models.Index(
+                fields=['prescriber', 'prescribed_date'],
+                include=['status', 'patient'],
+                name='rx_prescriber_date_ix',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.full_name} - {self.status}"
@@ -44,5 +53,11 @@ class PrescriptionMedication(models.Model):
     quantity = models.PositiveIntegerField()
     refills = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            # Medications of a prescription together with their drugs, without touching the table
+            models.Index(fields=['prescription', 'drug'], name='rx_pm_prescription_drug_ix'),
+        ]
+
     def __str__(self):
         return f"{self.drug.name} for {self.prescription.patient.full_name}"
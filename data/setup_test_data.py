@@ -20,8 +20,12 @@ from users.models import User
 from patients.models import Patient, Allergy, PatientAllergy
 from drugs.models import Drug, DrugInteraction
 from rx.models import Prescription, PrescriptionMedication, MedicationAdherence
+from analytics.caching import bump_prescriber_version
+from drugs.caching import invalidate_suggestions
+from django.db import transaction
 from django.utils import timezone
 
+@transaction.atomic
 def create_test_data():
     print("🚀 Setting up SafePrescribe test data...")
     
@@ -42,14 +46,14 @@ def create_test_data():
     else:
         print("✅ Test doctor already exists")
     
-    # Create test allergies
-    allergies = []
+    # Create test allergies: one lookup, then one INSERT for the missing ones
     allergy_names = ['Penicillin', 'Sulfa', 'NSAID', 'Latex', 'Aspirin']
-    for name in allergy_names:
-        allergy, created = Allergy.objects.get_or_create(name=name)
-        allergies.append(allergy)
-        if created:
-            print(f"✅ Created allergy: {name}")
+    existing_allergies = set(Allergy.objects.filter(name__in=allergy_names).values_list('name', flat=True))
+    new_allergy_names = [name for name in allergy_names if name not in existing_allergies]
+    Allergy.objects.bulk_create([Allergy(name=name) for name in new_allergy_names], ignore_conflicts=True)
+    for name in new_allergy_names:
+        print(f"✅ Created allergy: {name}")
+    allergies_by_name = {allergy.name: allergy for allergy in Allergy.objects.filter(name__in=allergy_names)}
     
     # Create test patients with different characteristics
     patients_data = [
@@ -130,6 +134,7 @@ def create_test_data():
     ]
     
     patients = []
+    patient_allergies = []
     for data in patients_data:
         allergies_list = data.pop('allergies', [])
         description = data.pop('description', '')
@@ -145,17 +150,17 @@ def create_test_data():
         if created:
             print(f"✅ Created {description}: {patient.first_name} {patient.last_name}")
             
-            # Add allergies
+            # Add allergies (inserted together below)
             for allergy_name in allergies_list:
-                allergy = Allergy.objects.get(name=allergy_name)
-                PatientAllergy.objects.create(
+                patient_allergies.append(PatientAllergy(
                     patient=patient,
-                    allergy=allergy,
+                    allergy=allergies_by_name[allergy_name],
                     severity='moderate'
-                )
+                ))
                 print(f"   - Added allergy: {allergy_name}")
         else:
             print(f"✅ {description} already exists: {patient.first_name} {patient.last_name}")
+    PatientAllergy.objects.bulk_create(patient_allergies)
     
     # Create sample prescriptions for testing analytics
     print("\n📊 Creating sample prescriptions for analytics testing...")
@@ -208,8 +213,8 @@ def create_test_data():
             print(f"✅ Created prescription for {data['patient'].first_name}: {data['reason']}")
             
             # Add medications to prescription
-            for i, drug in enumerate(data['medications']):
-                PrescriptionMedication.objects.create(
+            medications = PrescriptionMedication.objects.bulk_create([
+                PrescriptionMedication(
                     prescription=prescription,
                     drug=drug,
                     dosage=f"{500 + i*50}mg",
@@ -219,19 +224,28 @@ def create_test_data():
                     refills=1,
                     reason=f"Treatment for {data['reason']}"
                 )
+                for i, drug in enumerate(data['medications'])
+            ])
+            for drug in data['medications']:
                 print(f"   - Added medication: {drug.name}")
             
-            # Create some adherence records
-            for i in range(3):
-                adherence_date = prescribed_date + timedelta(days=i+1)
-                MedicationAdherence.objects.create(
-                    prescription_medication=prescription.prescription_medications.first(),
+            # Create some adherence records for the first medication
+            MedicationAdherence.objects.bulk_create([
+                MedicationAdherence(
+                    prescription_medication=medications[0],
                     patient=data['patient'],
-                    date=adherence_date,
+                    date=prescribed_date + timedelta(days=i+1),
                     taken=True,
                     notes="Patient took medication as prescribed",
                     recorded_by=doctor
                 )
+                for i in range(3)
+            ])
+    
+    # bulk_create skips the post_save receivers that invalidate the doctor's cached dashboards and
+    # everyone's cached AI suggestions, so invalidate both once the whole run commits
+    transaction.on_commit(lambda: bump_prescriber_version(doctor.id))
+    transaction.on_commit(invalidate_suggestions)
     
     print("\n🎉 Test data setup complete!")
     print("\n📋 Test Credentials:")